@@ -1,19 +1,38 @@
+from __future__ import annotations
+
+import logging
 import os
-from typing import Optional, List
-from dotenv import load_dotenv
-from bfxapi import Client, REST_HOST
-from bfxapi.types import Notification
+from typing import TYPE_CHECKING, Optional, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from bfxapi.types import Notification
+
+logger = logging.getLogger(__name__)
+
+# bfxapi 與 .env 都延遲到真正需要認證時才載入，公開指令不必付出這些啟動成本
+_ENV_LOADED = False
+
+
+def load_environment():
+    """Load environment variables from .env file (only once per process)"""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _ENV_LOADED = True
 
-# Load environment variables from .env file
-load_dotenv()
 
 class AuthenticatedBitfinexAPI:
     def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None):
+        load_environment()
         self.api_key = api_key or os.getenv('BITFINEX_API_KEY')
         self.api_secret = api_secret or os.getenv('BITFINEX_API_SECRET')
         if not self.api_key or not self.api_secret:
             raise ValueError("API key and secret are required. Set BITFINEX_API_KEY and BITFINEX_API_SECRET environment variables.")
 
+        from bfxapi import Client, REST_HOST
+
         self.client = Client(
             rest_host=REST_HOST,
             api_key=self.api_key,
@@ -27,7 +46,7 @@ class AuthenticatedBitfinexAPI:
             wallets = self.client.rest.auth.get_wallets()
             return wallets
         except Exception as e:
-            print(f"Failed to retrieve wallets: {e}")
+            logger.error("Failed to retrieve wallets: %s", e)
             return None
 
     def get_funding_offers(self, symbol: Optional[str] = None) -> Optional[List]:
@@ -36,7 +55,7 @@ class AuthenticatedBitfinexAPI:
             offers = self.client.rest.auth.get_funding_offers(symbol=symbol)
             return offers
         except Exception as e:
-            print(f"Failed to retrieve funding offers: {e}")
+            logger.error("Failed to retrieve funding offers: %s", e)
             return None
 
     def get_funding_credits(self, symbol: Optional[str] = None) -> Optional[List]:
@@ -45,7 +64,7 @@ class AuthenticatedBitfinexAPI:
             credits = self.client.rest.auth.get_funding_credits(symbol=symbol)
             return credits
         except Exception as e:
-            print(f"Failed to retrieve funding credits: {e}")
+            logger.error("Failed to retrieve funding credits: %s", e)
             return None
 
     def get_funding_loans(self, symbol: Optional[str] = None) -> Optional[List]:
@@ -54,11 +73,12 @@ class AuthenticatedBitfinexAPI:
             loans = self.client.rest.auth.get_funding_loans(symbol=symbol)
             return loans
         except Exception as e:
-            print(f"Failed to retrieve funding loans: {e}")
+            logger.error("Failed to retrieve funding loans: %s", e)
             return None
 
-    def post_funding_offer(self, symbol: str, amount: float, rate: float, period: int) -> Optional[Notification]:
-        """Submit a funding offer (lending)"""
+    def post_funding_offer(self, symbol: str, amount: Union[str, float], rate: Union[str, float],
+                           period: int) -> Optional[Notification]:
+        """Submit a funding offer (lending); decimal strings are sent to the API unchanged"""
         try:
             notification = self.client.rest.auth.submit_funding_offer(
                 type="LIMIT",
@@ -69,7 +89,7 @@ class AuthenticatedBitfinexAPI:
             )
             return notification
         except Exception as e:
-            print(f"Failed to submit funding offer: {e}")
+            logger.error("Failed to submit funding offer: %s", e)
             return None
 
     def cancel_funding_offer(self, offer_id: int) -> Optional[Notification]:
@@ -78,7 +98,7 @@ class AuthenticatedBitfinexAPI:
             notification = self.client.rest.auth.cancel_funding_offer(id=offer_id)
             return notification
         except Exception as e:
-            print(f"Failed to cancel funding offer: {e}")
+            logger.error("Failed to cancel funding offer: %s", e)
             return None
 
     def cancel_all_funding_offers(self, symbol: Optional[str] = None) -> Optional[Notification]:
@@ -87,17 +107,25 @@ class AuthenticatedBitfinexAPI:
             notification = self.client.rest.auth.cancel_all_funding_offers(currency=symbol)
             return notification
         except Exception as e:
-            print(f"Failed to cancel all funding offers: {e}")
+            logger.error("Failed to cancel all funding offers: %s", e)
             return None
 
     def cancel_funding_offers(self, offer_ids: List[int]) -> List[Optional[Notification]]:
         """Cancel multiple specific funding offers by their IDs"""
-        results = []
-        for offer_id in offer_ids:
-            try:
-                notification = self.cancel_funding_offer(offer_id)
-                results.append(notification)
-            except Exception as e:
-                print(f"Failed to cancel funding offer {offer_id}: {e}")
-                results.append(None)
-        return results
\ No newline at end of file
+        if not offer_ids:
+            return []
+
+        # 依序送出：同一把 API key 的 nonce 必須嚴格遞增，共用 client 並行送出可能亂序而被拒 (nonce: small)
+        return [self.cancel_funding_offer(offer_id) for offer_id in offer_ids]
+
+    def rebalance(self, symbol: str, new_offers: List[Tuple[float, float, int]]) -> Tuple[Optional[Notification], List[Optional[Notification]]]:
+        """Cancel all offers for a currency (e.g., 'USD') and submit new (amount, rate, period) offers"""
+        cancel_result = self.cancel_all_funding_offers(symbol)
+        if not cancel_result or cancel_result.status != "SUCCESS" or not new_offers:
+            return cancel_result, []
+
+        # 取消成功的通知即代表伺服器端已處理，不需再輪詢 get_funding_offers 直到清空
+        # 新掛單依序送出：共用 client 並行簽名請求可能因 nonce 亂序被拒，造成取消後只掛上部分資金
+        funding_symbol = f"f{symbol}"
+        results = [self.post_funding_offer(funding_symbol, *offer) for offer in new_offers]
+        return cancel_result, results
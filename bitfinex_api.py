@@ -1,40 +1,224 @@
+import asyncio
+import logging
+import time
+from functools import lru_cache
 import requests
-import json
-from typing import Optional, List, Dict, Any
+import orjson
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from rate_limiter import PUBLIC_RATE_LIMITER
+from cache import TTLCache, FileCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # noqa: F401  urllib3 需要 brotli 才能解壓 br 回應
+    _ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip"
+
+
+# 重試策略與連線池只建立一次；池大小需容納並行取消與非同步 fan-out，避免丟棄連線後重新握手
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.25,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset({'GET'})  # 公開 API 只有 GET，可安全重試
+)
+_ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=64, pool_block=False, max_retries=_RETRY)
+
+
+def _build_session() -> requests.Session:
+    """建立可重用連線的 Session (keep-alive + 重試)"""
+    session = requests.Session()
+    session.headers.update({'Accept-Encoding': _ACCEPT_ENCODING})
+    session.mount("https://", _ADAPTER)
+    return session
+
+
+# 全進程共用的連線池，所有 BitfinexAPI 實例都重用同一個 Session
+_SESSION = _build_session()
+
+
+@lru_cache(maxsize=1)
+def _http2_client():
+    """Process-wide httpx HTTP/2 client, created on first use (httpx is optional)"""
+    import httpx
+
+    return httpx.Client(http2=True, timeout=10, limits=httpx.Limits(max_keepalive_connections=16))
+
+# 短效快取：(url, params) -> 回應，避免同一秒內重複打相同端點
+_CACHE = TTLCache(maxsize=512)
+
 
 class BitfinexAPI:
     BASE_URL = "https://api-pub.bitfinex.com/v2"
+    TIMEOUT = (3.05, 10)  # (connect, read) seconds
+    # 各端點快取秒數，未列出的端點不快取
+    CACHE_TTL = {'ticker': 0.5, 'tickers': 0.5, 'book': 0.25, 'trades': 1.0}
+    # 跨行程 (磁碟) 快取秒數；已結束的歷史成交區間不會再變動，可以保存較久
+    FILE_CACHE_TTL = {'ticker': 2.0, 'tickers': 2.0, 'book': 2.0, 'trades': 2.0, 'trades_history': 3600.0}
+
+    # 預先組好的完整 URL 模板，避免每次呼叫重新拼接字串
+    _TICKER_URL = BASE_URL + "/ticker/f%s"
+    _TICKERS_URL = BASE_URL + "/tickers"
+    _BOOK_URL = BASE_URL + "/book/f%s/%s"
+    _TRADES_URL = BASE_URL + "/trades/f%s/hist"
+
+    def __init__(self, http2: bool = False, file_cache: Optional[FileCache] = None):
+        self._file_cache = file_cache
+        if http2:
+            # HTTP/2 後端：同一條 TLS 連線上多工處理並行請求，所有實例共用
+            import httpx
+
+            self._session = _http2_client()
+            self._timeout = 10
+            self._request_errors = (httpx.HTTPError, orjson.JSONDecodeError)
+        else:
+            self._session = _SESSION
+            self._timeout = self.TIMEOUT
+            self._request_errors = (requests.exceptions.RequestException, orjson.JSONDecodeError)
 
-    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        url = f"{self.BASE_URL}{endpoint}"
+    def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None, ttl: float = 0,
+                      file_ttl: float = 0) -> Any:
+        key = (url, tuple(sorted(params.items())) if params else None)
+        if ttl:
+            data = _CACHE.get(key)
+            if data is not None:
+                return data
+        file_ttl = file_ttl if self._file_cache is not None else 0
+        if file_ttl:
+            data = self._file_cache.get(key, file_ttl)
+            if data is not None:
+                if ttl:
+                    _CACHE.set(key, data, ttl)
+                return data
+
+        PUBLIC_RATE_LIMITER.wait_if_needed()
         try:
-            response = requests.get(url, params=params)
+            response = self._session.get(url, params=params, timeout=self._timeout)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
+            data = orjson.loads(response.content)
+        except self._request_errors as e:
+            logger.error("Request failed: %s", e)
             return None
 
+        if ttl:
+            _CACHE.set(key, data, ttl)
+        if file_ttl:
+            self._file_cache.set(key, data)
+        return data
+
     def get_funding_ticker(self, symbol: str) -> Optional[List]:
         """Get funding ticker for a symbol (e.g., 'USD')"""
-        endpoint = f"/ticker/f{symbol}"
-        return self._make_request(endpoint)
+        return self._make_request(self._TICKER_URL % symbol, ttl=self.CACHE_TTL['ticker'],
+                                  file_ttl=self.FILE_CACHE_TTL['ticker'])
+
+    def get_funding_tickers(self, symbols: List[str]) -> Optional[Dict[str, List]]:
+        """Get funding tickers for several symbols in one request (e.g., ['USD', 'BTC'])"""
+        data = self._make_request(self._TICKERS_URL, {'symbols': ','.join('f' + s for s in symbols)},
+                                  ttl=self.CACHE_TTL['tickers'], file_ttl=self.FILE_CACHE_TTL['tickers'])
+        if data is None:
+            return None
+        # 每列為 [SYMBOL, FRR, BID, ...]，去掉 symbol 後與單一 ticker 格式相同
+        return {row[0][1:]: row[1:] for row in data}
 
     def get_funding_book(self, symbol: str, precision: str = 'P0') -> Optional[List[List]]:
         """Get funding order book for a symbol"""
-        endpoint = f"/book/f{symbol}/{precision}"
-        return self._make_request(endpoint)
+        return self._make_request(self._BOOK_URL % (symbol, precision), ttl=self.CACHE_TTL['book'],
+                                  file_ttl=self.FILE_CACHE_TTL['book'])
+
+    def get_funding_book_array(self, symbol: str, precision: str = 'P0'):
+        """Get funding order book as a float64 numpy array with columns [RATE, PERIOD, COUNT, AMOUNT]"""
+        import numpy as np
+
+        data = self.get_funding_book(symbol, precision)
+        if not data:
+            return None
+        return np.asarray(data, dtype=np.float64)
+
+    @staticmethod
+    def best_offer_rate(book) -> Optional[float]:
+        """Lowest rate among lending offers (AMOUNT > 0) in a book array"""
+        offers = book[book[:, 3] > 0]
+        if not len(offers):
+            return None
+        return float(offers[offers[:, 0].argmin(), 0])
+
+    def iter_funding_book(self, symbol: str, precision: str = 'P0') -> Iterator[List]:
+        """Yield funding order book rows one at a time while the response streams in
+
+        A failure partway through re-raises after logging, so a truncated book is never mistaken for a complete one.
+        """
+        if not isinstance(self._session, requests.Session):
+            # httpx 後端沒有 raw 串流，直接沿用一般請求
+            yield from self.get_funding_book(symbol, precision) or []
+            return
+
+        import ijson
+
+        PUBLIC_RATE_LIMITER.wait_if_needed()
+        try:
+            with self._session.get(self._BOOK_URL % (symbol, precision), stream=True,
+                                   timeout=self._timeout) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True  # 讓 urllib3 先解壓 gzip/br
+                yield from ijson.items(response.raw, 'item', use_float=True)
+        except (requests.exceptions.RequestException, ijson.JSONError) as e:
+            logger.error("Request failed: %s", e)
+            raise  # 已 yield 出去的列無法收回，只能讓呼叫端知道資料不完整
 
     def get_funding_trades(self, symbol: str, limit: int = 100, start: Optional[int] = None,
                            end: Optional[int] = None, sort: int = -1) -> Optional[List[List]]:
         """Get funding trades history"""
-        endpoint = f"/trades/f{symbol}/hist"
-        params = {'limit': limit, 'sort': sort}
-        if start:
-            params['start'] = start
-        if end:
-            params['end'] = end
-        return self._make_request(endpoint, params)
+        params = {k: v for k, v in (('limit', limit), ('sort', sort), ('start', start), ('end', end))
+                  if v is not None}
+        # end 早於一分鐘前的查詢是固定的歷史區間
+        historical = end is not None and end < (time.time() - 60) * 1000
+        file_ttl = self.FILE_CACHE_TTL['trades_history' if historical else 'trades']
+        return self._make_request(self._TRADES_URL % symbol, params, ttl=self.CACHE_TTL['trades'], file_ttl=file_ttl)
+
+
+class AsyncBitfinexAPI(BitfinexAPI):
+    """以 httpx.AsyncClient 並行抓取多個公開端點"""
+
+    def __init__(self):
+        super().__init__()
+        import httpx  # 只有非同步路徑需要 httpx
+
+        self._httpx = httpx
+        self._async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            timeout=10,
+            http2=True
+        )
+
+    async def _make_request_async(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        await PUBLIC_RATE_LIMITER.wait_async()
+        try:
+            response = await self._async_client.get(url, params=params)
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        except (self._httpx.HTTPError, orjson.JSONDecodeError) as e:
+            logger.error("Request failed: %s", e)
+            return None
+
+    async def get_many(self, reqs: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Any]:
+        """同時發送多個 (url, params) 請求，結果依輸入順序回傳 (url 與同步版一樣由 _*_URL 模板組成)"""
+        return await asyncio.gather(
+            *[self._make_request_async(url, params) for url, params in reqs],
+            return_exceptions=True
+        )
+
+    async def aclose(self):
+        await self._async_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
 
 
 # Example usage
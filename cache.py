@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe in-memory cache; each entry expires after its own TTL"""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._data.pop(next(iter(self._data)))  # 丟掉最早放入的項目
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def default_cache_dir() -> str:
+    """Default on-disk cache directory (override with BITFINEX_CACHE_DIR)"""
+    return os.getenv('BITFINEX_CACHE_DIR') or os.path.join(
+        os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'bitfinex-bot')
+
+
+class FileCache:
+    """JSON files on disk so repeated CLI invocations can share recent responses"""
+
+    def __init__(self, root: Optional[str] = None, max_age: float = 3600.0, max_files: int = 1000):
+        # max_age 需不小於呼叫端最長的 TTL (BitfinexAPI 的歷史成交為 3600 秒)
+        self.root = root or default_cache_dir()
+        self.max_age = max_age
+        self.max_files = max_files
+        self._prune()
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.root, f"{digest}.json")
+
+    def _prune(self):
+        """刪除超過 max_age 的檔案 (含寫到一半遺留的 .tmp)，並只保留最新的 max_files 個"""
+        try:
+            with os.scandir(self.root) as it:
+                files = [(entry.stat().st_mtime, entry.path) for entry in it if entry.is_file()]
+        except OSError:
+            return  # 目錄還不存在
+        cutoff = time.time() - self.max_age
+        files.sort(reverse=True)
+        for index, (mtime, path) in enumerate(files):
+            if mtime < cutoff or index >= self.max_files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # 可能已被其他行程刪除
+
+    def get(self, key: Hashable, ttl: float) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or not isinstance(entry.get('ts'), (int, float)):
+            self._remove(path)  # 不是 set() 寫出的格式，留著也只會一直讀不到
+            return None
+        age = time.time() - entry['ts']
+        if age > ttl:
+            if age > self.max_age:
+                self._remove(path)  # 對任何呼叫端都已過期，不會再被讀到，直接刪掉
+            return None
+        return entry.get('data')
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def set(self, key: Hashable, value: Any):
+        # 先寫暫存檔再替換，避免其他行程讀到寫到一半的檔案
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps({'ts': time.time(), 'data': value}))
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.debug("Cache write failed: %s", e)
@@ -1,380 +1,482 @@
+from __future__ import annotations
+
+import atexit
 import click
+import io
+import logging
 import os
 import platform
+import operator
+import orjson
+import queue
+import re
+import sys
 import time
-from typing import Dict, Any, Optional, List
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
 from dataclasses import dataclass
+from functools import lru_cache, partial
+from itertools import islice
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
 from bitfinex_api import BitfinexAPI
-from authenticated_api import AuthenticatedBitfinexAPI
-from funding_market_analyzer import FundingMarketAnalyzer, FundingMarketAnalysis
-from rich.console import Console, Group
-from rich.table import Table
-from rich.panel import Panel
-from rich.prompt import Confirm
-
-console = Console()
-
-class RateLimiter:
-    """Simple rate limiter to control API request frequency"""
-    def __init__(self, max_calls_per_minute: int = 30, min_interval_ms: int = 100):
-        self.max_calls_per_minute = max_calls_per_minute
-        self.min_interval_ms = min_interval_ms  # Minimum interval between calls in milliseconds
-        self.calls = []
-        self.last_call_time = 0
-        self.lock = threading.Lock()
-
-    def wait_if_needed(self):
-        """Wait if necessary to respect rate limits"""
-        with self.lock:
-            now = time.time()
-            now_ms = int(now * 1000)
-
-            # Remove calls older than 1 minute
-            self.calls = [call_time for call_time in self.calls if now - call_time < 60]
-
-            # Ensure minimum interval between calls (for nonce safety)
-            time_since_last_call = now_ms - self.last_call_time
-            if time_since_last_call < self.min_interval_ms:
-                sleep_time = (self.min_interval_ms - time_since_last_call) / 1000.0
-                time.sleep(sleep_time)
-
-            # Check rate limit
-            if len(self.calls) >= self.max_calls_per_minute:
-                # Wait until the oldest call is more than 1 minute old
-                sleep_time = 60 - (now - self.calls[0])
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-
-            self.calls.append(now)
-            self.last_call_time = int(time.time() * 1000)
+from cache import FileCache
+from rate_limiter import RateLimiter
+from authenticated_api import AuthenticatedBitfinexAPI, load_environment
+from daemon import connect_auth_api, run_daemon
+
+if TYPE_CHECKING:
+    from funding_market_analyzer import FundingMarketAnalysis
+
+_log_listener = None
+
+def setup_logging(level: int = logging.WARNING):
+    """Route log records through a queue so error reporting is done by a background thread"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _log_listener = QueueListener(log_queue, handler)
 
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # 結束前把佇列中的記錄寫完
+
+@lru_cache(maxsize=1)
 def is_windows_terminal():
     """Detect if running in Windows terminal that supports Rich formatting"""
     return platform.system() == 'Windows'
 
+@lru_cache(maxsize=1)
 def is_bash_terminal():
     """Detect if running in Bash/Linux terminal"""
     return platform.system() in ['Linux', 'Darwin'] or 'bash' in os.environ.get('SHELL', '').lower()
 
-def format_funding_book(data, symbol):
+# 終端類型在整個進程中不變，載入時決定一次即可
+_IS_WINDOWS = is_windows_terminal()
+_IS_BASH = is_bash_terminal()
+
+# Rich 的匯入成本很高，只有 Windows 的表格輸出需要它；Bash 路徑完全不載入
+if _IS_WINDOWS:
+    from rich.console import Console, Group, NewLine
+    from rich.table import Table
+    from rich.panel import Panel
+    from rich.text import Text
+    from rich.style import Style
+
+    console = Console()
+else:
+    console = None
+
+# 需要回傳字串時使用的擷取 console：色彩設定沿用實際輸出的 console，ANSI 碼才會符合終端能力與 NO_COLOR
+# (export_text 一律以 truecolor 輸出，不看 color_system)；舊版 Windows 主控台不解析 ANSI 碼，非終端也只要純文字
+if _IS_WINDOWS:
+    _capture_styles = console.is_terminal and not console.legacy_windows
+    _capture_console = Console(file=io.StringIO(), width=console.width, force_terminal=_capture_styles,
+                               color_system=console.color_system if _capture_styles else None,
+                               no_color=console.no_color, legacy_windows=False)
+else:
+    _capture_console = None
+
+def _render(renderable, out_console=None):
+    """Print a Rich renderable straight to out_console, or return it as text when no console is given"""
+    if out_console is not None:
+        out_console.print(renderable)
+        return None
+    _capture_console.print(renderable)
+    buffer = _capture_console.file
+    text = buffer.getvalue()
+    # 清空緩衝區，避免長時間執行時累積
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+# Bash 表格的標題列與分隔線只建立一次
+_RULE_60 = '=' * 60
+_RULE_70 = '=' * 70
+_RULE_80 = '=' * 80
+_RULE_100 = '=' * 100
+_BOOK_HEADER = f"{'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Count':<8} {'Amount':<15} {'Type':<8}"
+_TRADES_HEADER = f"{'ID':<10} {'Timestamp':<20} {'Amount':<15} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8}"
+_WALLETS_HEADER = f"{'Type':<10} {'Currency':<10} {'Balance':<15} {'Available':<15} {'Interest':<12} {'Last Change':<15}"
+_POSITIONS_HEADER = f"{'Symbol':<8} {'Amount':<12} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Status':<10}"
+
+# 一次取出整列需要的欄位 (C 層級的 attrgetter)，取代逐欄屬性查找
+_WALLET_COLS = operator.attrgetter('wallet_type', 'currency', 'balance', 'available_balance', 'unsettled_interest', 'last_change')
+_OFFER_COLS = operator.attrgetter('symbol', 'amount', 'rate', 'period')
+
+def _offer_cols(offer):
+    """(symbol, amount, rate, period, status) for an offer/loan/credit, with defaults for missing fields"""
+    try:
+        symbol, amount, rate, period = _OFFER_COLS(offer)
+    except AttributeError:
+        symbol = getattr(offer, 'symbol', 'N/A')
+        amount = getattr(offer, 'amount', 0)
+        rate = getattr(offer, 'rate', 0)
+        period = getattr(offer, 'period', 0)
+    # bfxapi 的 FundingOffer 沒有 status 欄位 (是 offer_status)，多數情況會用預設值
+    return symbol, amount, rate, period, getattr(offer, 'status', 'Active')
+
+# 分析結果與錢包類型的字彙很小，預先算好標題大小寫，查表取代每列呼叫 str.title()
+_TITLE_CASE = {word: word.title() for word in (
+    "low", "medium", "high", "moderate",
+    "rising", "falling", "stable",
+    "exchange", "margin", "funding",
+)}
+
+def _title(word):
+    return _TITLE_CASE.get(word) or word.title()
+
+# 風險等級對應的顏色，未知等級視為低風險
+_RISK_COLORS = {"high": "red", "medium": "yellow", "low": "green"}
+
+# 固定寬度的資料列模板，直接綁定 str.format 方法，迴圈內省去屬性查找
+_BOOK_ROW_FMT = "{:<12.6f}% {:<12.4f}% {:<8}d {:<8} {:<15,.2f} {:<8}".format
+_TRADES_ROW_FMT = "{:<10} {:<20} {:<15,.2f} {:<12.6f}% {:<12.4f}% {:<8}d".format
+_WALLETS_ROW_FMT = "{:<10} {:<10} {:<15,.8f} {:<15,.8f} {:<12,.8f} {:<15}".format
+_POSITIONS_ROW_FMT = "{:<8} {:<12,.2f} {:<12.6f}% {:<12.4f}% {:<8}d {:<10}".format
+
+# Rich 表格欄位規格 (名稱, add_column 參數)，模組載入時建立一次
+_BOOK_COLS = (
+    ("Daily Rate", {"style": "yellow", "justify": "right"}),
+    ("Yearly Rate", {"style": "yellow", "justify": "right"}),
+    ("Period", {"style": "cyan", "justify": "center"}),
+    ("Count", {"style": "white", "justify": "right"}),
+    ("Amount", {"style": "white", "justify": "right"}),
+    ("Type", {"style": "blue"}),
+)
+_TRADES_COLS = (
+    ("ID", {"style": "white", "justify": "right"}),
+    ("Timestamp", {"style": "cyan"}),
+    ("Amount", {"style": "green", "justify": "right"}),
+    ("Daily Rate", {"style": "yellow", "justify": "right"}),
+    ("Yearly Rate", {"style": "yellow", "justify": "right"}),
+    ("Period", {"style": "blue", "justify": "center"}),
+)
+_WALLETS_COLS = (
+    ("Type", {"style": "cyan", "no_wrap": True}),
+    ("Currency", {"style": "green"}),
+    ("Balance", {"style": "yellow", "justify": "right"}),
+    ("Available", {"style": "green", "justify": "right"}),
+    ("Unsettled Interest", {"style": "red", "justify": "right"}),
+    ("Last Change", {"style": "white", "no_wrap": True}),
+)
+_OFFERS_COLS = (
+    ("Symbol", {"style": "cyan", "no_wrap": True}),
+    ("Amount", {"style": "green", "justify": "right"}),
+    ("Daily Rate", {"style": "yellow", "justify": "right"}),
+    ("Yearly Rate", {"style": "yellow", "justify": "right"}),
+    ("Period", {"style": "blue", "justify": "center"}),
+    ("Status", {"style": "white"}),
+)
+_CREDITS_COLS = (
+    ("Symbol", {"style": "cyan", "no_wrap": True}),
+    ("Amount", {"style": "red", "justify": "right"}),
+    ("Daily Rate", {"style": "yellow", "justify": "right"}),
+    ("Yearly Rate", {"style": "yellow", "justify": "right"}),
+    ("Period", {"style": "blue", "justify": "center"}),
+    ("Status", {"style": "white"}),
+)
+_TICKER_COLS = (
+    ("Field", {"style": "cyan", "no_wrap": True}),
+    ("Daily Rate", {"style": "yellow", "justify": "right"}),
+    ("Yearly Rate", {"style": "yellow", "justify": "right"}),
+)
+_ANALYSIS_STATS_COLS = (
+    ("Indicator", {"style": "cyan", "no_wrap": True}),
+    ("Value", {"style": "green"}),
+    ("Description", {"style": "white"}),
+)
+_VOLUME_COLS = (
+    ("Period", {"style": "cyan"}),
+    ("Volume", {"style": "green", "justify": "right"}),
+)
+_STRATEGY_COLS = (
+    ("Period", {"style": "cyan"}),
+    ("Recommended Rate", {"style": "yellow"}),
+    ("Amount Range", {"style": "green"}),
+    ("Risk Level", {"style": "red"}),
+    ("Yield Expectation", {"style": "blue"}),
+)
+_OVERVIEW_COLS = (
+    ("Metric", {"style": "cyan", "no_wrap": True}),
+    ("Pending Lending", {"style": "blue", "justify": "right"}),
+    ("Active Lending", {"style": "red", "justify": "right"}),
+    ("Total Provided", {"style": "yellow", "justify": "right"}),
+)
+_POSITION_COLS = (
+    ("Position Type", {"style": "cyan"}),
+    ("Amount", {"style": "green", "justify": "right"}),
+    ("Count", {"style": "white", "justify": "right"}),
+)
+_INCOME_COLS = (
+    ("Metric", {"style": "cyan"}),
+    ("Daily", {"style": "yellow", "justify": "right"}),
+    ("Yearly", {"style": "yellow", "justify": "right"}),
+)
+_PERIOD_COLS = (
+    ("Period", {"style": "cyan"}),
+    ("Pending Offers", {"style": "blue", "justify": "right"}),
+    ("Active Lending", {"style": "red", "justify": "right"}),
+)
+
+def _add_columns(table, cols):
+    """Add every (name, kwargs) column spec to a Rich table; style strings are parsed into Style objects here, once"""
+    for name, kw in cols:
+        if 'style' in kw:
+            kw = {**kw, 'style': Style.parse(kw['style'])}
+        table.add_column(name, **kw)
+
+def _new_table(cols, title, header_style="bold magenta"):
+    """Build a fresh Rich table from a column spec; a new object per render keeps renderers reentrant"""
+    table = Table(title=title, show_header=True, header_style=Style.parse(header_style))
+    _add_columns(table, cols)
+    return table
+
+# 資金簿 AMOUNT > 0 為放貸掛單 (LEND)，< 0 為借款需求 (BORROW)；以布林值直接索引
+_BOOK_SIDES = ("BORROW", "LEND")
+_BOOK_AMOUNT_COLORS = ("red", "green")  # 每列依正負著色，而不是整欄只看第一列
+
+def _render_book_rich(data, symbol, out_console=None):
+    """Rich table rendering for format_funding_book (Windows)"""
+    table = _new_table(_BOOK_COLS, f"Funding Order Book for f{symbol}")
+
+    add_row = table.add_row  # 迴圈內避免重複屬性查找
+    for entry in islice(data, 20):  # Show first 20 entries
+        rate, period, count, amount = entry
+        rate_pct = rate * 100.0
+        is_offer = amount > 0
+        add_row(
+            f"{rate_pct:.6f}%",
+            f"{rate_pct*365:.4f}%",
+            f"{int(period)}d",
+            f"{int(count)}",
+            f"[{_BOOK_AMOUNT_COLORS[is_offer]}]{abs(amount):,.2f}[/]",
+            _BOOK_SIDES[is_offer]
+        )
+
+    panel = Panel(table, title="Bitfinex Funding Order Book", border_style="blue")
+    return _render(panel, out_console)
+
+def _render_book_bash(data, symbol, out_console=None):
+    """Plain-text rendering for format_funding_book (Bash)"""
+    rows = [f"Bitfinex Funding Order Book - f{symbol}", _RULE_80, _BOOK_HEADER, _RULE_80]
+
+    for entry in islice(data, 20):
+        rate, period, count, amount = entry
+        rate_pct = rate * 100.0
+        rows.append(_BOOK_ROW_FMT(rate_pct, rate_pct*365, int(period), int(count), abs(amount), _BOOK_SIDES[amount > 0]))
+
+    return "\n".join(rows).strip()
+
+_RENDER_BOOK = _render_book_rich if _IS_WINDOWS else _render_book_bash
+
+@lru_cache(maxsize=32)
+def _cached_book_text(rows, symbol):
+    return _RENDER_BOOK(rows, symbol)
+
+def format_funding_book(data, symbol, out_console=None):
     """Format funding order book data"""
     if not data:
         return "No order book data"
+    if out_console is None:
+        # 只顯示前 20 列，以這些列為快取鍵；資料未變時直接重用上次的文字
+        return _cached_book_text(tuple(map(tuple, islice(data, 20))), symbol)
+    return _RENDER_BOOK(data, symbol, out_console)
+
+_TS_FMT = "%Y-%m-%d %H:%M:%S"
+
+@lru_cache(maxsize=1024)
+def _format_trade_time(seconds):
+    """Local time string for a trade timestamp in seconds (adjacent trades often share the same second)"""
+    return time.strftime(_TS_FMT, time.localtime(seconds))
+
+def _render_trades_rich(data, symbol, out_console=None):
+    """Rich table rendering for format_funding_trades (Windows)"""
+    table = _new_table(_TRADES_COLS, f"Recent Funding Trades for f{symbol}")
+
+    add_row = table.add_row  # 迴圈內避免重複屬性查找
+    for trade in islice(data, 20):  # Show first 20 trades
+        trade_id, timestamp, amount, rate, period = trade
+        rate_pct = rate * 100.0
+        # Convert timestamp to readable format
+        time_str = _format_trade_time(timestamp // 1000)
+
+        add_row(
+            str(trade_id),
+            time_str,
+            f"{amount:,.2f}",
+            f"{rate_pct:.6f}%",
+            f"{rate_pct*365:.4f}%",
+            f"{int(period)}d"
+        )
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title=f"Funding Order Book for f{symbol}", show_header=True, header_style="bold magenta")
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-        table.add_column("Period", style="cyan", justify="center")
-        table.add_column("Count", style="white", justify="right")
-        table.add_column("Amount", style="red" if data[0][3] < 0 else "green", justify="right")
-        table.add_column("Type", style="blue")
-
-        for entry in data[:20]:  # Show first 20 entries
-            rate, period, count, amount = entry
-            daily_rate_pct = f"{rate*100:.6f}%"
-            yearly_rate_pct = f"{rate*365*100:.4f}%"
-            amount_type = "LEND" if amount < 0 else "BORROW"
-            table.add_row(
-                daily_rate_pct,
-                yearly_rate_pct,
-                f"{int(period)}d",
-                f"{int(count)}",
-                f"{abs(amount):,.2f}",
-                amount_type
-            )
+    panel = Panel(table, title="Bitfinex Funding Trades History", border_style="blue")
+    return _render(panel, out_console)
 
-        panel = Panel(table, title="Bitfinex Funding Order Book", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = f"Bitfinex Funding Order Book - f{symbol}\n{'='*80}\n"
-        output += f"{'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Count':<8} {'Amount':<15} {'Type':<8}\n"
-        output += f"{'='*80}\n"
+def _render_trades_bash(data, symbol, out_console=None):
+    """Plain-text rendering for format_funding_trades (Bash)"""
+    rows = [f"Bitfinex Funding Trades - f{symbol}", _RULE_100, _TRADES_HEADER, _RULE_100]
+
+    for trade in islice(data, 20):
+        trade_id, timestamp, amount, rate, period = trade
+        time_str = _format_trade_time(timestamp // 1000)
+        rate_pct = rate * 100.0
+        rows.append(_TRADES_ROW_FMT(trade_id, time_str, amount, rate_pct, rate_pct*365, int(period)))
+
+    return "\n".join(rows).strip()
 
-        for i, entry in enumerate(data[:20]):
-            rate, period, count, amount = entry
-            amount_type = "LEND" if amount > 0 else "BORROW"
-            output += f"{rate*100:<12.6f}% {rate*365*100:<12.4f}% {int(period):<8}d {int(count):<8} {abs(amount):<15,.2f} {amount_type:<8}\n"
+_RENDER_TRADES = _render_trades_rich if _IS_WINDOWS else _render_trades_bash
 
-        return output.strip()
+@lru_cache(maxsize=32)
+def _cached_trades_text(rows, symbol):
+    return _RENDER_TRADES(rows, symbol)
 
-def format_funding_trades(data, symbol):
+def format_funding_trades(data, symbol, out_console=None):
     """Format funding trades data"""
     if not data:
         return "No trades data"
+    if out_console is None:
+        return _cached_trades_text(tuple(map(tuple, islice(data, 20))), symbol)
+    return _RENDER_TRADES(data, symbol, out_console)
+
+def _render_wallets_rich(data, out_console=None):
+    """Rich table rendering for format_wallets (Windows)"""
+    table = _new_table(_WALLETS_COLS, "Account Wallets")
+
+    add_row = table.add_row  # 迴圈內避免重複屬性查找
+    for wallet in data:
+        wallet_type, currency, balance, available, interest, last_change = _WALLET_COLS(wallet)
+        add_row(
+            _title(wallet_type),
+            currency,
+            f"{balance:,.8f}",
+            f"{available:,.8f}",
+            f"{interest:,.8f}",
+            str(last_change) if last_change else "None"
+        )
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title=f"Recent Funding Trades for f{symbol}", show_header=True, header_style="bold magenta")
-        table.add_column("ID", style="white", justify="right")
-        table.add_column("Timestamp", style="cyan")
-        table.add_column("Amount", style="green", justify="right")
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-        table.add_column("Period", style="blue", justify="center")
-
-        for trade in data[:20]:  # Show first 20 trades
-            trade_id, timestamp, amount, rate, period = trade
-            daily_rate_pct = f"{rate*100:.6f}%"
-            yearly_rate_pct = f"{rate*365*100:.4f}%"
-            # Convert timestamp to readable format
-            from datetime import datetime
-            dt = datetime.fromtimestamp(timestamp / 1000)
-            time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-
-            table.add_row(
-                str(trade_id),
-                time_str,
-                f"{amount:,.2f}",
-                daily_rate_pct,
-                yearly_rate_pct,
-                f"{int(period)}d"
-            )
+    panel = Panel(table, title="Bitfinex Account Wallets", border_style="blue")
+    return _render(panel, out_console)
 
-        panel = Panel(table, title="Bitfinex Funding Trades History", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = f"Bitfinex Funding Trades - f{symbol}\n{'='*100}\n"
-        output += f"{'ID':<10} {'Timestamp':<20} {'Amount':<15} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8}\n"
-        output += f"{'='*100}\n"
+def _render_wallets_bash(data, out_console=None):
+    """Plain-text rendering for format_wallets (Bash)"""
+    rows = ["Bitfinex Account Wallets", _RULE_70, _WALLETS_HEADER, _RULE_70]
 
-        for trade in data[:20]:
-            trade_id, timestamp, amount, rate, period = trade
-            from datetime import datetime
-            dt = datetime.fromtimestamp(timestamp / 1000)
-            time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-            output += f"{trade_id:<10} {time_str:<20} {amount:<15,.2f} {rate*100:<12.6f}% {rate*365*100:<12.4f}% {int(period):<8}d\n"
+    for wallet in data:
+        wallet_type, currency, balance, available, interest, last_change = _WALLET_COLS(wallet)
+        rows.append(_WALLETS_ROW_FMT(_title(wallet_type), currency, balance, available, interest, str(last_change)[:14]))
 
-        return output.strip()
+    return "\n".join(rows).strip()
 
-def format_wallets(data):
+_RENDER_WALLETS = _render_wallets_rich if _IS_WINDOWS else _render_wallets_bash
+
+def format_wallets(data, out_console=None):
     """Format wallet data"""
     if not data:
         return "No wallet data"
+    return _RENDER_WALLETS(data, out_console)
+
+def _render_positions_rich(data, out_console=None, *, cols, title, daily_fmt, yearly_fmt, absolute=False):
+    """Rich table rendering shared by format_funding_offers/loans/credits (Windows)"""
+    table = _new_table(cols, title)
+
+    add_row = table.add_row  # 迴圈內避免重複屬性查找
+    for item in data:
+        symbol, amount, rate, period, status = _offer_cols(item)
+        if absolute:
+            amount = abs(amount)  # Show positive for display
+
+        rate_pct = rate * 100.0
+        add_row(
+            symbol,
+            f"{amount:,.2f}",
+            daily_fmt(rate_pct),
+            yearly_fmt(rate_pct*365),
+            f"{period}d",
+            status
+        )
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title="Account Wallets", show_header=True, header_style="bold magenta")
-        table.add_column("Type", style="cyan", no_wrap=True)
-        table.add_column("Currency", style="green")
-        table.add_column("Balance", style="yellow", justify="right")
-        table.add_column("Available", style="green", justify="right")
-        table.add_column("Unsettled Interest", style="red", justify="right")
-        table.add_column("Last Change", style="white", no_wrap=True)
-
-        for wallet in data:
-            table.add_row(
-                wallet.wallet_type.title(),
-                wallet.currency,
-                f"{wallet.balance:,.8f}",
-                f"{wallet.available_balance:,.8f}",
-                f"{wallet.unsettled_interest:,.8f}",
-                str(wallet.last_change) if wallet.last_change else "None"
-            )
-
-        panel = Panel(table, title="Bitfinex Account Wallets", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = "Bitfinex Account Wallets\n" + "="*70 + "\n"
-        output += f"{'Type':<10} {'Currency':<10} {'Balance':<15} {'Available':<15} {'Interest':<12} {'Last Change':<15}\n"
-        output += "="*70 + "\n"
-
-        for wallet in data:
-            output += f"{wallet.wallet_type.title():<10} {wallet.currency:<10} {wallet.balance:<15,.8f} {wallet.available_balance:<15,.8f} {wallet.unsettled_interest:<12,.8f} {str(wallet.last_change)[:14]:<15}\n"
+    panel = Panel(table, title=f"Bitfinex {title}", border_style="blue")
+    return _render(panel, out_console)
 
-        return output.strip()
+def _render_positions_bash(data, out_console=None, *, title, absolute=False):
+    """Plain-text rendering shared by format_funding_offers/loans/credits (Bash)"""
+    rows = [f"Bitfinex {title}", _RULE_80, _POSITIONS_HEADER, _RULE_80]
 
-def format_funding_offers(data):
-    """Format funding offers data"""
-    if not data:
-        return "No pending lending offers found"
+    for item in data:
+        symbol, amount, rate, period, status = _offer_cols(item)
+        if absolute:
+            amount = abs(amount)
+        rate_pct = rate * 100.0
+        rows.append(_POSITIONS_ROW_FMT(symbol, amount, rate_pct, rate_pct*365, period, status))
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title="Pending Lending Offers", show_header=True, header_style="bold magenta")
-        table.add_column("Symbol", style="cyan", no_wrap=True)
-        table.add_column("Amount", style="green", justify="right")
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-        table.add_column("Period", style="blue", justify="center")
-        table.add_column("Status", style="white")
-
-        for offer in data:
-            # Assuming offer object has these attributes
-            symbol = getattr(offer, 'symbol', 'N/A')
-            amount = getattr(offer, 'amount', 0)
-            rate = getattr(offer, 'rate', 0)
-            period = getattr(offer, 'period', 0)
-            status = getattr(offer, 'status', 'Active')
-
-            yearly_rate = rate * 365
-            table.add_row(
-                symbol,
-                f"{amount:,.2f}",
-                f"{rate*100:.4f}%",
-                f"{yearly_rate*100:.2f}%",
-                f"{period}d",
-                status
-            )
+    return "\n".join(rows).strip()
 
-        panel = Panel(table, title="Bitfinex Pending Lending Offers", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = "Bitfinex Pending Lending Offers\n" + "="*80 + "\n"
-        output += f"{'Symbol':<8} {'Amount':<12} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Status':<10}\n"
-        output += "="*80 + "\n"
+_pct2 = "{:.2f}%".format
+_pct4 = "{:.4f}%".format
+_pct6 = "{:.6f}%".format
 
-        for offer in data:
-            symbol = getattr(offer, 'symbol', 'N/A')
-            amount = getattr(offer, 'amount', 0)
-            rate = getattr(offer, 'rate', 0)
-            period = getattr(offer, 'period', 0)
-            status = getattr(offer, 'status', 'Active')
-            yearly_rate = rate * 365
+def _positions_renderer(title, cols, daily_fmt, yearly_fmt, absolute=False):
+    """掛單/放貸中/借入三種部位只差標題、欄位顏色、小數位與金額正負，綁定共用的渲染器"""
+    if _IS_WINDOWS:
+        return partial(_render_positions_rich, cols=cols, title=title,
+                       daily_fmt=daily_fmt, yearly_fmt=yearly_fmt, absolute=absolute)
+    return partial(_render_positions_bash, title=title, absolute=absolute)
 
-            output += f"{symbol:<8} {amount:<12,.2f} {rate*100:<12.6f}% {yearly_rate*100:<12.4f}% {period:<8}d {status:<10}\n"
+_RENDER_OFFERS = _positions_renderer("Pending Lending Offers", _OFFERS_COLS, _pct4, _pct2)
+_RENDER_LOANS = _positions_renderer("Active Lending Positions", _OFFERS_COLS, _pct6, _pct4)
+_RENDER_CREDITS = _positions_renderer("Active Funding Credits", _CREDITS_COLS, _pct6, _pct4, absolute=True)
 
-        return output.strip()
+def format_funding_offers(data, out_console=None):
+    """Format funding offers data"""
+    if not data:
+        return "No pending lending offers found"
+    return _RENDER_OFFERS(data, out_console)
 
-def format_funding_loans(data):
+def format_funding_loans(data, out_console=None):
     """Format funding loans data (active lent positions)"""
     if not data:
         return "No active lent positions found"
+    return _RENDER_LOANS(data, out_console)
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title="Active Lending Positions", show_header=True, header_style="bold magenta")
-        table.add_column("Symbol", style="cyan", no_wrap=True)
-        table.add_column("Amount", style="green", justify="right")
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-        table.add_column("Period", style="blue", justify="center")
-        table.add_column("Status", style="white")
-
-        for loan in data:
-            # Assuming loan object has these attributes
-            symbol = getattr(loan, 'symbol', 'N/A')
-            amount = getattr(loan, 'amount', 0)
-            rate = getattr(loan, 'rate', 0)
-            period = getattr(loan, 'period', 0)
-            status = getattr(loan, 'status', 'Active')
-
-            yearly_rate = rate * 365
-            table.add_row(
-                symbol,
-                f"{amount:,.2f}",
-                f"{rate*100:.6f}%",
-                f"{yearly_rate*100:.4f}%",
-                f"{period}d",
-                status
-            )
-
-        panel = Panel(table, title="Bitfinex Active Lending Positions", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = "Bitfinex Active Lending Positions\n" + "="*80 + "\n"
-        output += f"{'Symbol':<8} {'Amount':<12} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Status':<10}\n"
-        output += "="*80 + "\n"
-
-        for loan in data:
-            symbol = getattr(loan, 'symbol', 'N/A')
-            amount = getattr(loan, 'amount', 0)
-            rate = getattr(loan, 'rate', 0)
-            period = getattr(loan, 'period', 0)
-            status = getattr(loan, 'status', 'Active')
-            yearly_rate = rate * 365
-
-            output += f"{symbol:<8} {amount:<12,.2f} {rate*100:<12.6f}% {yearly_rate*100:<12.4f}% {period:<8}d {status:<10}\n"
-
-        return output.strip()
-
-def format_funding_credits(data):
+def format_funding_credits(data, out_console=None):
     """Format funding credits data (borrowings)"""
     if not data:
         return "No active funding credits found"
-
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-
-        table = Table(title="Active Funding Credits", show_header=True, header_style="bold magenta")
-        table.add_column("Symbol", style="cyan", no_wrap=True)
-        table.add_column("Amount", style="red", justify="right")
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-        table.add_column("Period", style="blue", justify="center")
-        table.add_column("Status", style="white")
-
-        for credit in data:
-            # Assuming credit object has these attributes
-            symbol = getattr(credit, 'symbol', 'N/A')
-            amount = abs(getattr(credit, 'amount', 0))  # Show positive for display
-            rate = getattr(credit, 'rate', 0)
-            period = getattr(credit, 'period', 0)
-            status = getattr(credit, 'status', 'Active')
-
-            yearly_rate = rate * 365
-            table.add_row(
-                symbol,
-                f"{amount:,.2f}",
-                f"{rate*100:.6f}%",
-                f"{yearly_rate*100:.4f}%",
-                f"{period}d",
-                status
-            )
-
-        panel = Panel(table, title="Bitfinex Active Funding Credits", border_style="blue")
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Simple text format for Bash
-        output = "Bitfinex Active Funding Credits\n" + "="*80 + "\n"
-        output += f"{'Symbol':<8} {'Amount':<12} {'Daily Rate':<12} {'Yearly Rate':<12} {'Period':<8} {'Status':<10}\n"
-        output += "="*80 + "\n"
-
-        for credit in data:
-            symbol = getattr(credit, 'symbol', 'N/A')
-            amount = abs(getattr(credit, 'amount', 0))  # Show positive for display
-            rate = getattr(credit, 'rate', 0)
-            period = getattr(credit, 'period', 0)
-            status = getattr(credit, 'status', 'Active')
-            yearly_rate = rate * 365
-
-            output += f"{symbol:<8} {amount:<12,.2f} {rate*100:<12.6f}% {yearly_rate*100:<12.4f}% {period:<8}d {status:<10}\n"
-
-        return output.strip()
-
-def format_funding_market_analysis(analysis: FundingMarketAnalysis) -> str:
+    return _RENDER_CREDITS(data, out_console)
+
+# Bash 市場統計區塊的模板，格式規格在載入時只解析一次
+_MARKET_STATS_FMT = (
+    "MARKET STATISTICS:\n"
+    "Average Rate (2-day):  {avg_2d:.8f} ({avg_2d_pct:.4f}%)\n"
+    "Average Rate (30-day): {avg_30d:.8f} ({avg_30d_pct:.4f}%)\n"
+    "Overall Average:      {avg_all:.8f} ({avg_all_pct:.4f}%)\n"
+    "Rate Volatility:      {volatility:.8f}\n"
+    "Bid-Ask Spread:      {spread:.8f} ({spread_pct:.4f}%)\n"
+    "Market Depth Score:  {depth:.2f}\n"
+    "Trend Direction:     {trend}\n\n"
+).format_map
+
+def _percentages(distribution, total=None):
+    """[(key, value, share of total in %)] for a {key: amount} distribution; pass total if already known"""
+    total = total or sum(distribution.values())
+    if total <= 0:
+        return [(key, value, 0) for key, value in distribution.items()]
+    scale = 100.0 / total  # 只除一次，每列改為乘法
+    return [(key, value, value * scale) for key, value in distribution.items()]
+
+def _volume_rows(distribution, total=None):
+    """[(period, "volume (pct%)")] for a volume distribution, shared by both output styles"""
+    return [(f"{period}", f"{volume:,.2f} ({percentage:.1f}%)") for period, volume, percentage in _percentages(distribution, total)]
+
+def format_funding_market_analysis(analysis: FundingMarketAnalysis, out_console: Optional[Console] = None) -> Optional[str]:
     """Format funding market analysis results"""
     if not analysis:
         return "Error: No analysis data available"
@@ -383,55 +485,41 @@ def format_funding_market_analysis(analysis: FundingMarketAnalysis) -> str:
     strategies = analysis.strategies
     risks = analysis.risk_assessment
     conditions = analysis.market_conditions
+    avg_2d, avg_30d, avg_all = stats.avg_rate_2d, stats.avg_rate_30d, stats.avg_rate_all
+    volatility, spread = stats.rate_volatility, stats.bid_ask_spread
+    volume_rows = _volume_rows(stats.volume_distribution, stats.volume_total)
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-        from rich.text import Text
-
+    if _IS_WINDOWS:
         # 市場統計表格
-        stats_table = Table(title=f"Funding Market Analysis - {stats.symbol}", show_header=True, header_style="bold magenta")
-        stats_table.add_column("Indicator", style="cyan", no_wrap=True)
-        stats_table.add_column("Value", style="green")
-        stats_table.add_column("Description", style="white")
-
-        stats_table.add_row("Average Rate (2-day)", f"{stats.avg_rate_2d:.8f}", f"{stats.avg_rate_2d*100:.4f}%")
-        stats_table.add_row("Average Rate (30-day)", f"{stats.avg_rate_30d:.8f}", f"{stats.avg_rate_30d*100:.4f}%")
-        stats_table.add_row("Overall Average Rate", f"{stats.avg_rate_all:.8f}", f"{stats.avg_rate_all*100:.4f}%")
-        stats_table.add_row("Rate Volatility", f"{stats.rate_volatility:.8f}", f"±{stats.rate_volatility*100:.4f}%")
-        stats_table.add_row("Bid-Ask Spread", f"{stats.bid_ask_spread:.8f}", f"{stats.bid_ask_spread*100:.4f}%")
+        stats_table = _new_table(_ANALYSIS_STATS_COLS, f"Funding Market Analysis - {stats.symbol}")
+
+        stats_table.add_row("Average Rate (2-day)", f"{avg_2d:.8f}", f"{avg_2d*100:.4f}%")
+        stats_table.add_row("Average Rate (30-day)", f"{avg_30d:.8f}", f"{avg_30d*100:.4f}%")
+        stats_table.add_row("Overall Average Rate", f"{avg_all:.8f}", f"{avg_all*100:.4f}%")
+        stats_table.add_row("Rate Volatility", f"{volatility:.8f}", f"±{volatility*100:.4f}%")
+        stats_table.add_row("Bid-Ask Spread", f"{spread:.8f}", f"{spread*100:.4f}%")
         stats_table.add_row("Market Depth Score", f"{stats.market_depth_score:.2f}", "Liquidity indicator")
-        stats_table.add_row("Trend Direction", stats.trend_direction.title(), "Market movement")
+        stats_table.add_row("Trend Direction", _title(stats.trend_direction), "Market movement")
 
         # 成交量分佈表格
-        volume_table = Table(title="Volume Distribution", show_header=True, header_style="bold blue")
-        volume_table.add_column("Period", style="cyan")
-        volume_table.add_column("Volume", style="green", justify="right")
+        volume_table = _new_table(_VOLUME_COLS, "Volume Distribution", "bold blue")
 
-        total_volume = sum(stats.volume_distribution.values())
-        for period, volume in stats.volume_distribution.items():
-            percentage = (volume / total_volume * 100) if total_volume > 0 else 0
-            volume_table.add_row(f"{period}", f"{volume:,.2f} ({percentage:.1f}%)")
+        for period, volume_str in volume_rows:
+            volume_table.add_row(period, volume_str)
 
         # 策略建議表格
-        strategy_table = Table(title="Strategy Recommendations", show_header=True, header_style="bold green")
-        strategy_table.add_column("Period", style="cyan")
-        strategy_table.add_column("Recommended Rate", style="yellow")
-        strategy_table.add_column("Amount Range", style="green")
-        strategy_table.add_column("Risk Level", style="red")
-        strategy_table.add_column("Yield Expectation", style="blue")
+        strategy_table = _new_table(_STRATEGY_COLS, "Strategy Recommendations", "bold green")
 
         for period_key, strategy in strategies.items():
             period_name = "2 Days" if period_key == "2_day" else "30 Days"
             amount_range = f"${strategy.amount_range_min:,} - ${strategy.amount_range_max:,}"
-            risk_color = "red" if strategy.risk_level == "high" else "yellow" if strategy.risk_level == "medium" else "green"
 
             strategy_table.add_row(
                 period_name,
                 f"{strategy.rate_pct:.4f}%",
                 amount_range,
-                strategy.risk_level.title(),
-                strategy.yield_expectation.title()
+                _title(strategy.risk_level),
+                _title(strategy.yield_expectation)
             )
 
         # 風險評估
@@ -444,8 +532,7 @@ def format_funding_market_analysis(analysis: FundingMarketAnalysis) -> str:
             "Overall Risk": risks.overall_risk
         }
         for risk_type, level in risk_dict.items():
-            color = "red" if level == "high" else "yellow" if level == "medium" else "green"
-            risk_text.append(f"• {risk_type}: {level.title()}\n", style=color)
+            risk_text.append(f"• {risk_type}: {_title(level)}\n", style=_RISK_COLORS.get(level, "green"))
 
         # 市場狀況
         condition_text = Text(f"Market Conditions: {conditions}", style="cyan")
@@ -462,52 +549,52 @@ def format_funding_market_analysis(analysis: FundingMarketAnalysis) -> str:
             anomaly_text = Text("No significant anomalies detected", style="green")
 
         # 順序顯示各個表格，避免layout問題
-        with console.capture() as capture:
-            console.print(Panel(stats_table, title="Market Statistics"))
-            console.print()
-            console.print(Panel(volume_table, title="Volume Distribution"))
-            console.print()
-            console.print(Panel(strategy_table, title="Strategy Recommendations"))
-            console.print()
-            console.print(Panel(Group(risk_text, condition_text, anomaly_text), title="Risk & Market Analysis"))
-        return capture.get()
+        return _render(Group(
+            Panel(stats_table, title="Market Statistics"),
+            NewLine(),
+            Panel(volume_table, title="Volume Distribution"),
+            NewLine(),
+            Panel(strategy_table, title="Strategy Recommendations"),
+            NewLine(),
+            Panel(Group(risk_text, condition_text, anomaly_text), title="Risk & Market Analysis")
+        ), out_console)
 
     else:
         # 簡單文字格式 for Bash
-        output = f"Funding Market Analysis - {stats.symbol}\n"
-        output += "="*60 + "\n\n"
+        parts = [f"Funding Market Analysis - {stats.symbol}\n"]
+        append = parts.append
+        append("="*60 + "\n\n")
 
         # 市場統計
-        output += "MARKET STATISTICS:\n"
-        output += f"Average Rate (2-day):  {stats.avg_rate_2d:.8f} ({stats.avg_rate_2d*100:.4f}%)\n"
-        output += f"Average Rate (30-day): {stats.avg_rate_30d:.8f} ({stats.avg_rate_30d*100:.4f}%)\n"
-        output += f"Overall Average:      {stats.avg_rate_all:.8f} ({stats.avg_rate_all*100:.4f}%)\n"
-        output += f"Rate Volatility:      {stats.rate_volatility:.8f}\n"
-        output += f"Bid-Ask Spread:      {stats.bid_ask_spread:.8f} ({stats.bid_ask_spread*100:.4f}%)\n"
-        output += f"Market Depth Score:  {stats.market_depth_score:.2f}\n"
-        output += f"Trend Direction:     {stats.trend_direction.title()}\n\n"
+        append(_MARKET_STATS_FMT({
+            'avg_2d': avg_2d, 'avg_2d_pct': avg_2d*100,
+            'avg_30d': avg_30d, 'avg_30d_pct': avg_30d*100,
+            'avg_all': avg_all, 'avg_all_pct': avg_all*100,
+            'volatility': volatility,
+            'spread': spread, 'spread_pct': spread*100,
+            'depth': stats.market_depth_score,
+            'trend': _title(stats.trend_direction),
+        }))
 
         # 成交量分佈
-        output += "VOLUME DISTRIBUTION:\n"
-        total_volume = sum(stats.volume_distribution.values())
-        for period, volume in stats.volume_distribution.items():
-            percentage = (volume / total_volume * 100) if total_volume > 0 else 0
-            output += f"{period}: {volume:,.2f} ({percentage:.1f}%)\n"
-        output += "\n"
+        append("VOLUME DISTRIBUTION:\n")
+        for period, volume_str in volume_rows:
+            append(f"{period}: {volume_str}\n")
+        append("\n")
 
         # 策略建議
-        output += "STRATEGY RECOMMENDATIONS:\n"
+        append("STRATEGY RECOMMENDATIONS:\n")
         for period_key, strategy in strategies.items():
             period_name = "2 Days" if period_key == "2_day" else "30 Days"
-            output += f"{period_name}:\n"
-            output += f"  Recommended Rate: {strategy.rate_pct:.4f}%\n"
-            output += f"  Amount Range: ${strategy.amount_range_min:,} - ${strategy.amount_range_max:,}\n"
-            output += f"  Risk Level: {strategy.risk_level.title()}\n"
-            output += f"  Yield Expectation: {strategy.yield_expectation.title()}\n"
-            output += f"  Rationale: {strategy.rationale}\n\n"
+            append(f"{period_name}:\n")
+            append(f"  Recommended Rate: {strategy.rate_pct:.4f}%\n")
+            append(f"  Amount Range: ${strategy.amount_range_min:,} - ${strategy.amount_range_max:,}\n")
+            append(f"  Risk Level: {_title(strategy.risk_level)}\n")
+            append(f"  Yield Expectation: {_title(strategy.yield_expectation)}\n")
+            append(f"  Rationale: {strategy.rationale}\n\n")
 
         # 風險評估
-        output += "RISK ASSESSMENT:\n"
+        append("RISK ASSESSMENT:\n")
         risk_dict = {
             "Volatility Risk": risks.volatility_risk,
             "Liquidity Risk": risks.liquidity_risk,
@@ -515,30 +602,28 @@ def format_funding_market_analysis(analysis: FundingMarketAnalysis) -> str:
             "Overall Risk": risks.overall_risk
         }
         for risk_type, level in risk_dict.items():
-            output += f"{risk_type}: {level.title()}\n"
+            append(f"{risk_type}: {_title(level)}\n")
 
-        output += f"\nMarket Conditions: {conditions}\n"
+        append(f"\nMarket Conditions: {conditions}\n")
 
         # 異常記錄
         if stats.anomalies:
-            output += "\nANOMALIES DETECTED:\n"
+            append("\nANOMALIES DETECTED:\n")
             for anomaly in stats.anomalies[:5]:
                 if anomaly['type'] == 'large_trade':
-                    output += f"• Large trade: ${anomaly['amount']:,.2f} at {anomaly['rate']*100:.4f}%\n"
+                    append(f"• Large trade: ${anomaly['amount']:,.2f} at {anomaly['rate']*100:.4f}%\n")
                 elif anomaly['type'] == 'extreme_rate':
-                    output += f"• Extreme rate: {anomaly['rate']*100:.4f}% ({anomaly['below_avg_pct']:.1f}% below average)\n"
+                    append(f"• Extreme rate: {anomaly['rate']*100:.4f}% ({anomaly['below_avg_pct']:.1f}% below average)\n")
         else:
-            output += "\nNo significant anomalies detected\n"
+            append("\nNo significant anomalies detected\n")
 
-        return output.strip()
+        return "".join(parts).strip()
 
-def format_funding_portfolio(portfolio_data: Dict[str, Any]) -> str:
-    """Format funding portfolio statistics"""
-    if "error" in portfolio_data:
-        return f"Error: {portfolio_data['error']}"
+def write_funding_portfolio(portfolio_data: Dict[str, Any], out=None) -> None:
+    """Write the plain-text portfolio report to out (default: stdout) section by section"""
+    out = out or sys.stdout
 
     summary = portfolio_data['summary']
-    wallet = portfolio_data.get('wallet_statistics', {})
     pending_lending = portfolio_data['pending_lending_statistics']
     active_lending = portfolio_data['active_lending_statistics']
     unused_funds = portfolio_data.get('unused_funds_statistics', {})
@@ -546,280 +631,364 @@ def format_funding_portfolio(portfolio_data: Dict[str, Any]) -> str:
     risks = portfolio_data['risk_metrics']
     periods = portfolio_data['period_distribution']
 
-    if is_windows_terminal():
-        from rich.table import Table
-        from rich.panel import Panel
-        from rich.text import Text
-
-        # 投資組合總覽表格
-        overview_table = Table(title="Portfolio Overview", show_header=True, header_style="bold magenta")
-        overview_table.add_column("Metric", style="cyan", no_wrap=True)
-        overview_table.add_column("Pending Lending", style="blue", justify="right")
-        overview_table.add_column("Active Lending", style="red", justify="right")
-        overview_table.add_column("Total Provided", style="yellow", justify="right")
-
-        overview_table.add_row(
-            "Available Balance",
-            "",
-            "",
-            f"${summary.get('available_for_lending', 0):,.2f}"
-        )
-        overview_table.add_row(
-            "Total Amount",
-            f"${summary['total_pending_lending_amount']:,.2f}",
-            f"${summary['total_active_lending_amount']:,.2f}",
-            f"${summary['total_lending_amount']:,.2f}"
-        )
-        overview_table.add_row(
-            "Active Positions",
-            str(summary['pending_offers_count']),
-            str(summary['active_lends_count']),
-            str(summary['pending_offers_count'] + summary['active_lends_count'])
-        )
-
-        # 日利率和年利率
-        pending_daily_rate = pending_lending['weighted_avg_rate']
-        active_daily_rate = active_lending['weighted_avg_rate']
-        total_daily_rate = (pending_daily_rate + active_daily_rate) / 2 if active_daily_rate > 0 else pending_daily_rate
+    # 多次用到的數值先取出
+    pending_amount = summary['total_pending_lending_amount']
+    active_amount = summary['total_active_lending_amount']
+    total_amount = summary['total_lending_amount']
+    offers_count = summary['pending_offers_count']
+    lends_count = summary['active_lends_count']
+
+    # 日利率和年利率
+    pending_daily_rate = pending_lending['weighted_avg_rate']
+    active_daily_rate = active_lending['weighted_avg_rate']
+    total_daily_rate = (pending_daily_rate + active_daily_rate) / 2 if active_daily_rate > 0 else pending_daily_rate
+
+    write = out.write
+    write("Funding Portfolio Analysis\n" + "="*60 + "\n\n")
+
+    # 總覽
+    write("PORTFOLIO OVERVIEW:\n")
+    write(f"Available Balance:        ${summary.get('available_for_lending', 0):,.2f}\n")
+    write(f"Pending Lending Amount:   ${pending_amount:,.2f}\n")
+    write(f"Active Lending Amount:    ${active_amount:,.2f}\n")
+    write(f"Total Lending Amount:     ${total_amount:,.2f}\n")
+    write(f"Pending Lending Orders:  {offers_count}\n")
+    write(f"Active Lending Positions: {lends_count}\n")
+
+    write(f"Avg Daily Rate (P/A/T): {pending_daily_rate*100:.4f}% / {active_daily_rate*100:.4f}% / {total_daily_rate*100:.4f}%\n")
+    write(f"Avg Yearly Rate (P/A/T): {pending_daily_rate*36500.0:.2f}% / {active_daily_rate*36500.0:.2f}% / {total_daily_rate*36500.0:.2f}%\n\n")
+
+    # 資產總覽
+    write("PORTFOLIO POSITIONS:\n")
+    write(f"Active Lending:          ${active_amount:,.2f} ({lends_count} positions)\n")
+    write(f"Pending Offers:          ${pending_amount:,.2f} ({offers_count} positions)\n")
+    write(f"Unused Funds:            ${summary['total_unused_funds']:,.2f} ({summary['unused_funds_count']} positions)\n")
+    write(f"Total Provided:          ${total_amount:,.2f} ({offers_count + lends_count} positions)\n\n")
+
+    # 收益分析
+    write("INCOME ANALYSIS:\n")
+    write(f"Daily Lending Income:    ${income['estimated_daily_income']:.2f}\n")
+    write(f"Yearly Lending Income:   ${income['estimated_yearly_income']:.2f}\n")
+    write(f"Income Margin:           {income['net_income_margin']:.2f}%\n\n")
+
+    # 掛單放貸統計
+    write("PENDING LENDING STATISTICS:\n")
+    write(f"Total Amount:           ${pending_lending['total_amount']:,.2f}\n")
+    write(f"Average Rate:           {pending_lending['avg_rate']*100:.4f}%\n")
+    write(f"Weighted Avg Rate:      {pending_daily_rate*100:.4f}%\n")
+    write(f"Rate Range:             {pending_lending['rate_range']['min']*100:.4f}% - {pending_lending['rate_range']['max']*100:.4f}%\n\n")
+
+    # 已借出資金統計
+    write("ACTIVE LENDING STATISTICS:\n")
+    write(f"Total Amount:           ${active_lending['total_amount']:,.2f}\n")
+    write(f"Average Rate:           {active_lending['avg_rate']*100:.4f}%\n")
+    write(f"Weighted Avg Rate:      {active_daily_rate*100:.4f}%\n")
+    write(f"Rate Range:             {active_lending['rate_range']['min']*100:.4f}% - {active_lending['rate_range']['max']*100:.4f}%\n\n")
+
+    # 未使用資金統計
+    write("UNUSED FUNDS STATISTICS:\n")
+    write(f"Total Amount:           ${unused_funds.get('total_amount', 0):,.2f}\n")
+    write(f"Average Rate:           {unused_funds.get('avg_rate', 0)*100:.4f}%\n")
+    write(f"Weighted Avg Rate:      {unused_funds.get('weighted_avg_rate', 0)*100:.4f}%\n\n")
+
+    # 風險指標
+    write("RISK METRICS:\n")
+    write(f"Concentration Risk:    {risks['concentration_risk']:.2f}\n")
+    write(f"Duration Risk:         {risks['duration_risk']:.2f}\n")
+    write(f"Liquidity Ratio:       {risks['liquidity_ratio']:.2f}\n\n")
+
+    # 期間分佈
+    write("PERIOD DISTRIBUTION:\n")
+    write("Pending Offers:\n")
+    for period, count in periods['pending_periods'].items():
+        write(f"  {period}: {count} positions\n")
+    write("Active Lending:\n")
+    for period, count in periods['active_periods'].items():
+        write(f"  {period}: {count} positions\n")
+
+def _period_days(period_key: str) -> int:
+    """Sort key for "2d"/"30d"/"120d" period labels (numeric, so 120d comes after 30d)"""
+    days = period_key[:-1]
+    return int(days) if period_key[-1:] == 'd' and days.isdigit() else 0
+
+def format_funding_portfolio(portfolio_data: Dict[str, Any], out_console: Optional[Console] = None) -> Optional[str]:
+    """Format funding portfolio statistics"""
+    if "error" in portfolio_data:
+        return f"Error: {portfolio_data['error']}"
 
-        overview_table.add_row(
-            "Avg Daily Rate",
-            f"{pending_daily_rate*100:.4f}%",
-            f"{active_daily_rate*100:.4f}%",
-            f"{total_daily_rate*100:.4f}%"
-        )
-        overview_table.add_row(
-            "Avg Yearly Rate",
-            f"{pending_daily_rate*365*100:.2f}%",
-            f"{active_daily_rate*365*100:.2f}%",
-            f"{total_daily_rate*365*100:.2f}%"
-        )
+    if not _IS_WINDOWS:
+        # Bash：直接寫入 StringIO，不再累積字串片段
+        buf = io.StringIO()
+        write_funding_portfolio(portfolio_data, buf)
+        return buf.getvalue().strip()
 
-        # 資產總覽表格 - 只顯示放貸相關
-        position_table = Table(title="Portfolio Positions", show_header=True, header_style="bold blue")
-        position_table.add_column("Position Type", style="cyan")
-        position_table.add_column("Amount", style="green", justify="right")
-        position_table.add_column("Count", style="white", justify="right")
-
-        position_table.add_row("Active Lending", f"${summary['total_active_lending_amount']:,.2f}", str(summary['active_lends_count']))
-        position_table.add_row("Pending Offers", f"${summary['total_pending_lending_amount']:,.2f}", str(summary['pending_offers_count']))
-        position_table.add_row("Unused Funds", f"${summary['total_unused_funds']:,.2f}", str(summary['unused_funds_count']))
-        position_table.add_row("Total Provided", f"${summary['total_lending_amount']:,.2f}", str(summary['pending_offers_count'] + summary['active_lends_count']))
-
-        # 收益分析表格 - 只顯示收益
-        income_table = Table(title="Income Analysis", show_header=True, header_style="bold green")
-        income_table.add_column("Metric", style="cyan")
-        income_table.add_column("Daily", style="yellow", justify="right")
-        income_table.add_column("Yearly", style="yellow", justify="right")
-
-        income_table.add_row("Lending Income", f"${income['estimated_daily_income']:.2f}", f"${income['estimated_yearly_income']:.2f}")
-        income_table.add_row("Income Margin", "", f"{income['net_income_margin']:.2f}%")
-
-        # 期間分佈表格
-        period_table = Table(title="Period Distribution", show_header=True, header_style="bold blue")
-        period_table.add_column("Period", style="cyan")
-        period_table.add_column("Pending Offers", style="blue", justify="right")
-        period_table.add_column("Active Lending", style="red", justify="right")
-
-        all_periods = set(periods['pending_periods'].keys()) | set(periods['active_periods'].keys())
-        for period in sorted(all_periods):
-            pending_count = periods['pending_periods'].get(period, 0)
-            active_count = periods['active_periods'].get(period, 0)
-            period_table.add_row(period, str(pending_count), str(active_count))
-
-        # 風險指標
-        risk_text = Text()
-        risk_text.append("Risk Metrics:\n", style="bold red")
-        risk_text.append(f"• Concentration Risk: {risks['concentration_risk']:.2f}\n", style="red")
-        risk_text.append(f"• Duration Risk: {risks['duration_risk']:.2f}\n", style="blue")
-        risk_text.append(f"• Liquidity Ratio: {risks['liquidity_ratio']:.2f}\n", style="cyan")
-
-        # 貨幣分佈
-        if active_lending['symbol_distribution']:
-            currency_text = Text("Currency Distribution:\n", style="bold magenta")
-            total_lending = sum(active_lending['symbol_distribution'].values())
-            for symbol, amount in active_lending['symbol_distribution'].items():
-                percentage = (amount / total_lending * 100) if total_lending > 0 else 0
-                currency_text.append(f"• {symbol}: ${amount:,.2f} ({percentage:.1f}%)\n", style="green")
-
-            with console.capture() as capture:
-                console.print(Panel(overview_table, title="Portfolio Overview"))
-                console.print()
-                console.print(Panel(position_table, title="Portfolio Positions"))
-                console.print()
-                console.print(Panel(income_table, title="Income Analysis"))
-                console.print()
-                console.print(Panel(period_table, title="Period Distribution"))
-                console.print()
-                console.print(Panel(Group(risk_text, currency_text), title="Risk & Distribution Analysis"))
-        else:
-            with console.capture() as capture:
-                console.print(Panel(overview_table, title="Portfolio Overview"))
-                console.print()
-                console.print(Panel(position_table, title="Portfolio Positions"))
-                console.print()
-                console.print(Panel(income_table, title="Income Analysis"))
-                console.print()
-                console.print(Panel(period_table, title="Period Distribution"))
-                console.print()
-                console.print(Panel(risk_text, title="Risk Analysis"))
-
-        return capture.get()
+    summary = portfolio_data['summary']
+    wallet = portfolio_data.get('wallet_statistics', {})
+    pending_lending = portfolio_data['pending_lending_statistics']
+    active_lending = portfolio_data['active_lending_statistics']
+    income = portfolio_data['income_analysis']
+    risks = portfolio_data['risk_metrics']
+    periods = portfolio_data['period_distribution']
 
+    # 多次用到的數值先取出
+    pending_amount = summary['total_pending_lending_amount']
+    active_amount = summary['total_active_lending_amount']
+    total_amount = summary['total_lending_amount']
+    offers_count = summary['pending_offers_count']
+    lends_count = summary['active_lends_count']
+
+    # 日利率和年利率
+    pending_daily_rate = pending_lending['weighted_avg_rate']
+    active_daily_rate = active_lending['weighted_avg_rate']
+    total_daily_rate = (pending_daily_rate + active_daily_rate) / 2 if active_daily_rate > 0 else pending_daily_rate
+
+    # 投資組合總覽表格
+    overview_table = _new_table(_OVERVIEW_COLS, "Portfolio Overview")
+
+    overview_table.add_row(
+        "Available Balance",
+        "",
+        "",
+        f"${summary.get('available_for_lending', 0):,.2f}"
+    )
+    overview_table.add_row(
+        "Total Amount",
+        f"${pending_amount:,.2f}",
+        f"${active_amount:,.2f}",
+        f"${total_amount:,.2f}"
+    )
+    overview_table.add_row(
+        "Active Positions",
+        str(offers_count),
+        str(lends_count),
+        str(offers_count + lends_count)
+    )
+
+    overview_table.add_row(
+        "Avg Daily Rate",
+        f"{pending_daily_rate*100:.4f}%",
+        f"{active_daily_rate*100:.4f}%",
+        f"{total_daily_rate*100:.4f}%"
+    )
+    overview_table.add_row(
+        "Avg Yearly Rate",
+        f"{pending_daily_rate*36500.0:.2f}%",
+        f"{active_daily_rate*36500.0:.2f}%",
+        f"{total_daily_rate*36500.0:.2f}%"
+    )
+
+    # 資產總覽表格 - 只顯示放貸相關
+    position_table = _new_table(_POSITION_COLS, "Portfolio Positions", "bold blue")
+
+    position_table.add_row("Active Lending", f"${active_amount:,.2f}", str(lends_count))
+    position_table.add_row("Pending Offers", f"${pending_amount:,.2f}", str(offers_count))
+    position_table.add_row("Unused Funds", f"${summary['total_unused_funds']:,.2f}", str(summary['unused_funds_count']))
+    position_table.add_row("Total Provided", f"${total_amount:,.2f}", str(offers_count + lends_count))
+
+    # 收益分析表格 - 只顯示收益
+    income_table = _new_table(_INCOME_COLS, "Income Analysis", "bold green")
+
+    income_table.add_row("Lending Income", f"${income['estimated_daily_income']:.2f}", f"${income['estimated_yearly_income']:.2f}")
+    income_table.add_row("Income Margin", "", f"{income['net_income_margin']:.2f}%")
+
+    # 期間分佈表格
+    period_table = _new_table(_PERIOD_COLS, "Period Distribution", "bold blue")
+
+    pending_periods, active_periods = periods['pending_periods'], periods['active_periods']
+    for period in sorted(pending_periods.keys() | active_periods.keys(), key=_period_days):
+        period_table.add_row(period, str(pending_periods.get(period, 0)), str(active_periods.get(period, 0)))
+
+    # 風險指標
+    risk_text = Text()
+    risk_text.append("Risk Metrics:\n", style="bold red")
+    risk_text.append(f"• Concentration Risk: {risks['concentration_risk']:.2f}\n", style="red")
+    risk_text.append(f"• Duration Risk: {risks['duration_risk']:.2f}\n", style="blue")
+    risk_text.append(f"• Liquidity Ratio: {risks['liquidity_ratio']:.2f}\n", style="cyan")
+
+    # 貨幣分佈
+    if active_lending['symbol_distribution']:
+        currency_text = Text("Currency Distribution:\n", style="bold magenta")
+        for symbol, amount, percentage in _percentages(active_lending['symbol_distribution']):
+            currency_text.append(f"• {symbol}: ${amount:,.2f} ({percentage:.1f}%)\n", style="green")
+        risk_panel = Panel(Group(risk_text, currency_text), title="Risk & Distribution Analysis")
     else:
-        # 簡單文字格式 for Bash
-        output = "Funding Portfolio Analysis\n" + "="*60 + "\n\n"
-
-        # 總覽
-        output += "PORTFOLIO OVERVIEW:\n"
-        output += f"Available Balance:        ${summary.get('available_for_lending', 0):,.2f}\n"
-        output += f"Pending Lending Amount:   ${summary['total_pending_lending_amount']:,.2f}\n"
-        output += f"Active Lending Amount:    ${summary['total_active_lending_amount']:,.2f}\n"
-        output += f"Total Lending Amount:     ${summary['total_lending_amount']:,.2f}\n"
-        output += f"Pending Lending Orders:  {summary['pending_offers_count']}\n"
-        output += f"Active Lending Positions: {summary['active_lends_count']}\n"
-
-        # 日利率和年利率
-        pending_daily_rate = pending_lending['weighted_avg_rate']
-        active_daily_rate = active_lending['weighted_avg_rate']
-        total_daily_rate = (pending_daily_rate + active_daily_rate) / 2 if active_daily_rate > 0 else pending_daily_rate
-
-        output += f"Avg Daily Rate (P/A/T): {pending_daily_rate*100:.4f}% / {active_daily_rate*100:.4f}% / {total_daily_rate*100:.4f}%\n"
-        output += f"Avg Yearly Rate (P/A/T): {pending_daily_rate*365*100:.2f}% / {active_daily_rate*365*100:.2f}% / {total_daily_rate*365*100:.2f}%\n\n"
-
-        # 資產總覽
-        output += "PORTFOLIO POSITIONS:\n"
-        output += f"Active Lending:          ${summary['total_active_lending_amount']:,.2f} ({summary['active_lends_count']} positions)\n"
-        output += f"Pending Offers:          ${summary['total_pending_lending_amount']:,.2f} ({summary['pending_offers_count']} positions)\n"
-        output += f"Unused Funds:            ${summary['total_unused_funds']:,.2f} ({summary['unused_funds_count']} positions)\n"
-        output += f"Total Provided:          ${summary['total_lending_amount']:,.2f} ({summary['pending_offers_count'] + summary['active_lends_count']} positions)\n\n"
-
-        # 收益分析
-        output += "INCOME ANALYSIS:\n"
-        output += f"Daily Lending Income:    ${income['estimated_daily_income']:.2f}\n"
-        output += f"Yearly Lending Income:   ${income['estimated_yearly_income']:.2f}\n"
-        output += f"Income Margin:           {income['net_income_margin']:.2f}%\n\n"
-
-        # 掛單放貸統計
-        output += "PENDING LENDING STATISTICS:\n"
-        output += f"Total Amount:           ${pending_lending['total_amount']:,.2f}\n"
-        output += f"Average Rate:           {pending_lending['avg_rate']*100:.4f}%\n"
-        output += f"Weighted Avg Rate:      {pending_lending['weighted_avg_rate']*100:.4f}%\n"
-        output += f"Rate Range:             {pending_lending['rate_range']['min']*100:.4f}% - {pending_lending['rate_range']['max']*100:.4f}%\n\n"
-
-        # 已借出資金統計
-        output += "ACTIVE LENDING STATISTICS:\n"
-        output += f"Total Amount:           ${active_lending['total_amount']:,.2f}\n"
-        output += f"Average Rate:           {active_lending['avg_rate']*100:.4f}%\n"
-        output += f"Weighted Avg Rate:      {active_lending['weighted_avg_rate']*100:.4f}%\n"
-        output += f"Rate Range:             {active_lending['rate_range']['min']*100:.4f}% - {active_lending['rate_range']['max']*100:.4f}%\n\n"
-
-        # 未使用資金統計
-        output += "UNUSED FUNDS STATISTICS:\n"
-        output += f"Total Amount:           ${unused_funds.get('total_amount', 0):,.2f}\n"
-        output += f"Average Rate:           {unused_funds.get('avg_rate', 0)*100:.4f}%\n"
-        output += f"Weighted Avg Rate:      {unused_funds.get('weighted_avg_rate', 0)*100:.4f}%\n\n"
-
-        # 風險指標
-        output += "RISK METRICS:\n"
-        output += f"Concentration Risk:    {risks['concentration_risk']:.2f}\n"
-        output += f"Duration Risk:         {risks['duration_risk']:.2f}\n"
-        output += f"Liquidity Ratio:       {risks['liquidity_ratio']:.2f}\n\n"
-
-        # 期間分佈
-        output += "PERIOD DISTRIBUTION:\n"
-        output += "Pending Offers:\n"
-        for period, count in periods['pending_periods'].items():
-            output += f"  {period}: {count} positions\n"
-        output += "Active Lending:\n"
-        for period, count in periods['active_periods'].items():
-            output += f"  {period}: {count} positions\n"
-
-        return output.strip()
-
-def format_funding_ticker(data, symbol):
+        risk_panel = Panel(risk_text, title="Risk Analysis")
+
+    return _render(Group(
+        Panel(overview_table, title="Portfolio Overview"),
+        NewLine(),
+        Panel(position_table, title="Portfolio Positions"),
+        NewLine(),
+        Panel(income_table, title="Income Analysis"),
+        NewLine(),
+        Panel(period_table, title="Period Distribution"),
+        NewLine(),
+        risk_panel
+    ), out_console)
+
+def _fmt_daily_rate(value):
+    return f"{value*100:.6f}%"
+
+def _fmt_yearly_rate(value):
+    return f"{value*36500.0:.4f}%"
+
+def _fmt_days(value):
+    return f"{int(value)} days"
+
+_fmt_size = "{:,.2f}".format
+_fmt_change = "{:.4f}%".format
+
+def _fmt_yearly_change(value):
+    return f"{value*365:.2f}%"
+
+# Ticker 欄位表：(名稱, data 索引, 值格式, 年化格式或 None)，Rich 與 Bash 共用
+# 注意 funding ticker 的 LAST_PRICE/HIGH/LOW 也是日利率 (不是價格)，所以同樣以百分比與年化顯示
+_TICKER_ROWS = (
+    ("FRR (Flash Return Rate)", 0, _fmt_daily_rate, _fmt_yearly_rate),
+    ("Best Bid", 1, _fmt_daily_rate, _fmt_yearly_rate),
+    ("Bid Period", 2, _fmt_days, None),
+    ("Bid Size", 3, _fmt_size, None),
+    ("Best Ask", 4, _fmt_daily_rate, _fmt_yearly_rate),
+    ("Ask Period", 5, _fmt_days, None),
+    ("Ask Size", 6, _fmt_size, None),
+    ("Daily Change", 8, _fmt_change, _fmt_yearly_change),
+    ("Last Price", 9, _fmt_daily_rate, _fmt_yearly_rate),
+    ("24h Volume", 10, _fmt_size, None),
+    ("24h High", 11, _fmt_daily_rate, _fmt_yearly_rate),
+    ("24h Low", 12, _fmt_daily_rate, _fmt_yearly_rate),
+    ("FRR Amount Available", 15, _fmt_size, None),
+)
+
+def _render_ticker_rich(data, symbol, out_console=None):
+    """Rich table rendering for format_funding_ticker (Windows)"""
+    table = _new_table(_TICKER_COLS, f"Funding Ticker for f{symbol}")
+
+    for label, idx, value_fmt, yearly_fmt in _TICKER_ROWS:
+        value = data[idx]
+        table.add_row(label, value_fmt(value), yearly_fmt(value) if yearly_fmt else "")
+
+    # Create a panel with the table
+    panel = Panel(table, title="Bitfinex Funding Market Data", border_style="blue")
+    return _render(panel, out_console)
+
+def _ticker_text_template():
+    """Bash ticker body with labels, padding and rules laid out once; only the {} value slots remain"""
+    lines = [_RULE_60]
+    for label, _, _, yearly_fmt in _TICKER_ROWS:
+        lines.append(f"{label + ':':<27}{{}}" + (" (Yearly: {})" if yearly_fmt else ""))
+    lines.append(_RULE_60)
+    return "\n".join(lines)
+
+_TICKER_TEXT_FMT = _ticker_text_template().format
+
+def _render_ticker_bash(data, symbol, out_console=None):
+    """Plain-text rendering for format_funding_ticker (Bash)"""
+    values = []
+    append = values.append
+    for _, idx, value_fmt, yearly_fmt in _TICKER_ROWS:
+        value = data[idx]
+        append(value_fmt(value))
+        if yearly_fmt:
+            append(yearly_fmt(value))
+
+    return f"Bitfinex Funding Market Data - f{symbol}\n" + _TICKER_TEXT_FMT(*values)
+
+_RENDER_TICKER = _render_ticker_rich if _IS_WINDOWS else _render_ticker_bash
+
+@lru_cache(maxsize=32)
+def _cached_ticker_text(data, symbol):
+    return _RENDER_TICKER(data, symbol)
+
+def format_funding_ticker(data, symbol, out_console=None):
     """Format funding ticker data - use Rich for Windows, simple text for Bash"""
     if not data or len(data) < 16:
         return "Invalid ticker data"
-
-    if is_windows_terminal():
-        # Use Rich table for Windows PowerShell
-        table = Table(title=f"Funding Ticker for f{symbol}", show_header=True, header_style="bold magenta")
-        table.add_column("Field", style="cyan", no_wrap=True)
-        table.add_column("Daily Rate", style="yellow", justify="right")
-        table.add_column("Yearly Rate", style="yellow", justify="right")
-
-        # Add rows - only for rate fields
-        table.add_row("FRR (Flash Return Rate)", f"{data[0]*100:.6f}%", f"{data[0]*365*100:.4f}%")
-        table.add_row("Best Bid", f"{data[1]*100:.6f}%", f"{data[1]*365*100:.4f}%")
-        table.add_row("Bid Period", f"{int(data[2])} days", "")
-        table.add_row("Bid Size", f"{data[3]:,.2f}", "")
-        table.add_row("Best Ask", f"{data[4]*100:.6f}%", f"{data[4]*365*100:.4f}%")
-        table.add_row("Ask Period", f"{int(data[5])} days", "")
-        table.add_row("Ask Size", f"{data[6]:,.2f}", "")
-        table.add_row("Daily Change", f"{data[8]:.4f}%", f"{data[8]*365:.2f}%")
-        table.add_row("Last Price", f"{data[9]*100:.6f}%", f"{data[9]*365*100:.4f}%")
-        table.add_row("24h Volume", f"{data[10]:,.2f}", "")
-        table.add_row("24h High", f"{data[11]*100:.6f}%", f"{data[11]*365*100:.4f}%")
-        table.add_row("24h Low", f"{data[12]*100:.6f}%", f"{data[12]*365*100:.4f}%")
-        table.add_row("FRR Amount Available", f"{data[15]:,.2f}", "")
-
-        # Create a panel with the table
-        panel = Panel(table, title="Bitfinex Funding Market Data", border_style="blue")
-
-        # Return the rendered output as string
-        with console.capture() as capture:
-            console.print(panel)
-        return capture.get()
-    else:
-        # Use simple text format for Bash/Linux terminals
-        formatted = f"""
-Bitfinex Funding Market Data - f{symbol}
-{'='*60}
-FRR (Flash Return Rate):     {data[0]*100:.6f}% (Yearly: {data[0]*365*100:.4f}%)
-Best Bid:                   {data[1]*100:.6f}% (Yearly: {data[1]*365*100:.4f}%)
-Bid Period:                {int(data[2])} days
-Bid Size:                  {data[3]:,.2f}
-Best Ask:                   {data[4]*100:.6f}% (Yearly: {data[4]*365*100:.4f}%)
-Ask Period:                {int(data[5])} days
-Ask Size:                  {data[6]:,.2f}
-Daily Change:              {data[8]:.4f}% (Yearly: {data[8]*365:.2f}%)
-Last Price:                {data[9]*100:.6f}% (Yearly: {data[9]*365*100:.4f}%)
-24h Volume:                {data[10]:,.2f}
-24h High:                  {data[11]*100:.6f}% (Yearly: {data[11]*365*100:.4f}%)
-24h Low:                   {data[12]*100:.6f}% (Yearly: {data[12]*365*100:.4f}%)
-FRR Amount Available:      {data[15]:,.2f}
-{'='*60}
-"""
-        return formatted.strip()
+    if out_console is None:
+        return _cached_ticker_text(tuple(data), symbol)
+    return _RENDER_TICKER(data, symbol, out_console)
+
+def _emit(text: str):
+    """Write a formatted block and its trailing newline to stdout with a single write call"""
+    # 仍寫入文字層 (而非 sys.stdout.buffer)，才不會與其他 print 的輸出順序錯亂
+    sys.stdout.write(text + "\n")
+
+# 給程式呼叫端的 JSON 輸出；分析結果可能含 numpy 數值
+_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+
+class _DotenvOption(click.Option):
+    """Option whose envvar may also come from .env; the file is loaded only when the envvar is looked up"""
+
+    def resolve_envvar_value(self, ctx):
+        load_environment()
+        return super().resolve_envvar_value(ctx)
+
+def auth_options(f):
+    """Shared --api-key/--api-secret options for authenticated commands"""
+    f = click.option('--api-secret', cls=_DotenvOption, envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')(f)
+    f = click.option('--api-key', cls=_DotenvOption, envvar='BITFINEX_API_KEY', help='Bitfinex API key')(f)
+    return f
+
+def _auth_api(api_key, api_secret):
+    """Authenticated API for the current invocation (daemon if running), cached on the click context"""
+    ctx = click.get_current_context(silent=True)
+    cache = ctx.find_root().ensure_object(dict) if ctx else {}
+    key = ('auth_api', api_key, api_secret)
+    if key not in cache:
+        cache[key] = connect_auth_api(api_key, api_secret)
+    return cache[key]
 
 @click.group()
 def cli():
     """Bitfinex Funding/Lending API CLI"""
-    pass
+    setup_logging()
 
 @cli.command()
 @click.option('--symbol', default='USD', help='Funding currency symbol (e.g., USD, BTC)')
 def funding_ticker(symbol):
     """Get funding ticker data"""
-    api = BitfinexAPI()
+    api = BitfinexAPI(file_cache=FileCache())
     data = api.get_funding_ticker(symbol)
     if data:
-        formatted = format_funding_ticker(data, symbol)
-        print(formatted)
+        formatted = format_funding_ticker(data, symbol, out_console=console)
+        if formatted:
+            _emit(formatted)
     else:
         print("Failed to retrieve data")
 
+@cli.command()
+@click.option('--symbols', default='USD,BTC,ETH', help='Comma-separated funding currency symbols (e.g., USD,BTC,ETH)')
+def funding_tickers(symbols):
+    """Get funding ticker data for several symbols in one request"""
+    symbol_list = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    if not symbol_list:
+        print("No symbols provided")
+        return
+
+    api = BitfinexAPI(file_cache=FileCache())
+    data = api.get_funding_tickers(symbol_list)
+    if data is None:
+        print("Failed to retrieve data")
+        return
+
+    for symbol in symbol_list:
+        if symbol in data:
+            formatted = format_funding_ticker(data[symbol], symbol, out_console=console)
+            if formatted:
+                _emit(formatted)
+        else:
+            print(f"Failed to retrieve data for {symbol}")
+
 @cli.command()
 @click.option('--symbol', default='USD', help='Funding currency symbol')
 @click.option('--precision', default='P0', help='Book precision')
 def funding_book(symbol, precision):
     """Get funding order book"""
-    api = BitfinexAPI()
+    api = BitfinexAPI(file_cache=FileCache())
     data = api.get_funding_book(symbol, precision)
     if data:
-        formatted = format_funding_book(data, symbol)
-        print(formatted)
+        formatted = format_funding_book(data, symbol, out_console=console)
+        if formatted:
+            _emit(formatted)
     else:
         print("Failed to retrieve data")
 
@@ -831,25 +1000,26 @@ def funding_book(symbol, precision):
 @click.option('--sort', default=-1, help='Sort order (-1 desc, 1 asc)')
 def funding_trades(symbol, limit, start, end, sort):
     """Get funding trades history"""
-    api = BitfinexAPI()
+    api = BitfinexAPI(file_cache=FileCache())
     data = api.get_funding_trades(symbol, limit, start, end, sort)
     if data:
-        formatted = format_funding_trades(data, symbol)
-        print(formatted)
+        formatted = format_funding_trades(data, symbol, out_console=console)
+        if formatted:
+            _emit(formatted)
     else:
         print("Failed to retrieve data")
 
 @cli.command()
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def wallets(api_key, api_secret):
     """Get account wallets (requires authentication)"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         data = api.get_wallets()
         if data:
-            formatted = format_wallets(data)
-            print(formatted)
+            formatted = format_wallets(data, out_console=console)
+            if formatted:
+                _emit(formatted)
         else:
             print("Failed to retrieve wallets")
     except ValueError as e:
@@ -858,16 +1028,16 @@ def wallets(api_key, api_secret):
 
 @cli.command()
 @click.option('--symbol', help='Funding symbol (e.g., fUSD) - optional, gets all if not specified')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_offers(symbol, api_key, api_secret):
     """Get user's pending lending offers (not yet lent out)"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         offers = api.get_funding_offers(symbol)
         if offers:
-            formatted = format_funding_offers(offers)
-            print(formatted)
+            formatted = format_funding_offers(offers, out_console=console)
+            if formatted:
+                _emit(formatted)
         else:
             print("No active funding offers found")
     except ValueError as e:
@@ -876,16 +1046,16 @@ def funding_offers(symbol, api_key, api_secret):
 
 @cli.command()
 @click.option('--symbol', help='Funding symbol (e.g., fUSD) - optional, gets all if not specified')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_credits(symbol, api_key, api_secret):
     """Get user's active funding credits (borrowings)"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         credits = api.get_funding_credits(symbol)
         if credits:
-            formatted = format_funding_credits(credits)
-            print(formatted)
+            formatted = format_funding_credits(credits, out_console=console)
+            if formatted:
+                _emit(formatted)
         else:
             print("No active funding credits found")
     except ValueError as e:
@@ -894,33 +1064,71 @@ def funding_credits(symbol, api_key, api_secret):
 
 @cli.command()
 @click.option('--symbol', help='Funding symbol (e.g., fUSD) - optional, gets all if not specified')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_active_lends(symbol, api_key, api_secret):
     """Get user's active lending positions (funds that have been lent out and are earning interest)"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         loans = api.get_funding_loans(symbol)
         if loans:
-            formatted = format_funding_loans(loans)
-            print(formatted)
+            formatted = format_funding_loans(loans, out_console=console)
+            if formatted:
+                _emit(formatted)
         else:
             print("No active lending positions found")
     except ValueError as e:
         print(f"Error: {e}")
         print("Please set BITFINEX_API_KEY and BITFINEX_API_SECRET environment variables or provide them as options.")
 
+_STATUS_SECTIONS = (
+    ("Pending Offers", 'get_funding_offers', format_funding_offers, "No active funding offers found"),
+    ("Funding Credits", 'get_funding_credits', format_funding_credits, "No active funding credits found"),
+    ("Active Lends", 'get_funding_loans', format_funding_loans, "No active lending positions found"),
+)
+
+@cli.command()
+@click.option('--symbol', help='Funding symbol (e.g., fUSD) - optional, gets all if not specified')
+@auth_options
+def funding_status(symbol, api_key, api_secret):
+    """Show pending offers, funding credits and active lends in one call"""
+    try:
+        api = _auth_api(api_key, api_secret)
+        # 共用同一個認證連線；請求依序發送，Bitfinex 要求 nonce 嚴格遞增，並行送出可能被拒
+        for title, method, formatter, empty_message in _STATUS_SECTIONS:
+            print(f"\n=== {title} ===")
+            data = getattr(api, method)(symbol)
+            if data:
+                formatted = formatter(data, out_console=console)
+                if formatted:
+                    _emit(formatted)
+            else:
+                print(empty_message)
+    except ValueError as e:
+        print(f"Error: {e}")
+        print("Please set BITFINEX_API_KEY and BITFINEX_API_SECRET environment variables or provide them as options.")
+
+_DECIMAL_RE = re.compile(r"\d+(\.\d+)?|\.\d+")
+_SIGNED_DECIMAL_RE = re.compile(r"-?(\d+(\.\d+)?|\.\d+)")
+
+def _decimal_string(pattern):
+    """保留使用者輸入的十進位字串原樣送出，避免 float 轉換造成精度漂移或 1e-05 這類科學記號"""
+    def callback(ctx, param, value):
+        if not pattern.fullmatch(value):
+            raise click.BadParameter(f"'{value}' is not a plain decimal number")
+        return value
+    return callback
+
 @cli.command()
 @click.option('--symbol', required=True, help='Funding symbol (e.g., fUSD)')
-@click.option('--amount', required=True, type=float, help='Amount to lend')
-@click.option('--rate', required=True, type=float, help='Daily interest rate (e.g., 0.0001 for 0.01%)')
+@click.option('--amount', required=True, callback=_decimal_string(_SIGNED_DECIMAL_RE),
+              help='Amount to lend (negative for a borrow offer)')
+@click.option('--rate', required=True, callback=_decimal_string(_DECIMAL_RE), help='Daily interest rate (e.g., 0.0001 for 0.01%)')
 @click.option('--period', required=True, type=int, help='Loan period in days')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_offer(symbol, amount, rate, period, api_key, api_secret):
     """Submit a funding offer (lending order)"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         notification = api.post_funding_offer(symbol, amount, rate, period)
         if notification:
             if notification.status == "SUCCESS":
@@ -935,12 +1143,11 @@ def funding_offer(symbol, amount, rate, period, api_key, api_secret):
 
 @cli.command()
 @click.option('--offer-id', required=True, type=int, help='Offer ID to cancel')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def cancel_funding_offer(offer_id, api_key, api_secret):
     """Cancel a specific funding offer"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         notification = api.cancel_funding_offer(offer_id)
         if notification:
             if notification.status == "SUCCESS":
@@ -955,12 +1162,11 @@ def cancel_funding_offer(offer_id, api_key, api_secret):
 
 @cli.command()
 @click.option('--symbol', help='Funding symbol (e.g., fUSD) - optional, cancels all if not specified')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def cancel_all_funding_offers(symbol, api_key, api_secret):
     """Cancel all funding offers, optionally filtered by symbol"""
     try:
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         notification = api.cancel_all_funding_offers(symbol)
         if notification:
             if notification.status == "SUCCESS":
@@ -976,8 +1182,7 @@ def cancel_all_funding_offers(symbol, api_key, api_secret):
 
 @cli.command()
 @click.option('--offer-ids', required=True, help='Comma-separated list of funding offer IDs to cancel (e.g., "12345,67890")')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def cancel_funding_offers(offer_ids, api_key, api_secret):
     """Cancel multiple specific funding offers by their IDs"""
     try:
@@ -988,7 +1193,7 @@ def cancel_funding_offers(offer_ids, api_key, api_secret):
             print("Error: No valid offer IDs provided")
             return
 
-        api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        api = _auth_api(api_key, api_secret)
         results = api.cancel_funding_offers(offer_id_list)
 
         successful = 0
@@ -1011,69 +1216,106 @@ def cancel_funding_offers(offer_ids, api_key, api_secret):
     except Exception as e:
         print(f"Unexpected error: {e}")
 
+@cli.command()
+@click.option('--socket', 'socket_path', help='UNIX socket path (default: $BITFINEX_DAEMON_SOCKET, else $XDG_RUNTIME_DIR or a per-user temp file)')
+@auth_options
+def daemon(socket_path, api_key, api_secret):
+    """Keep an authenticated API session alive for faster authenticated commands"""
+    try:
+        run_daemon(api_key, api_secret, socket_path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        print("Please set BITFINEX_API_KEY and BITFINEX_API_SECRET environment variables or provide them as options.")
+    except RuntimeError as e:
+        print(f"Error: {e}")
+
 @cli.command()
 @click.option('--symbol', default='USD', help='Funding currency symbol (e.g., USD, BTC)')
 def funding_market_analysis(symbol):
     """Comprehensive funding market analysis with statistics and strategy recommendations"""
+    from funding_market_analyzer import FundingMarketAnalyzer  # 只有分析相關指令需要
+
     analyzer = FundingMarketAnalyzer()
     analysis_result = analyzer.get_strategy_recommendations(symbol)
 
     if analysis_result:
-        formatted = format_funding_market_analysis(analysis_result)
-        print(formatted)
+        formatted = format_funding_market_analysis(analysis_result, out_console=console)
+        if formatted:
+            _emit(formatted)
     else:
         print("Failed to perform market analysis")
 
 @cli.command()
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_portfolio(api_key, api_secret):
     """Analyze user's lending portfolio with comprehensive statistics"""
+    from funding_market_analyzer import FundingMarketAnalyzer  # 只有分析相關指令需要
+
     analyzer = FundingMarketAnalyzer()
     portfolio_data = analyzer.analyze_lending_portfolio(api_key, api_secret)
 
     if portfolio_data and "error" not in portfolio_data:
-        formatted = format_funding_portfolio(portfolio_data)
-        print(formatted)
+        if _IS_WINDOWS:
+            format_funding_portfolio(portfolio_data, out_console=console)
+        else:
+            write_funding_portfolio(portfolio_data)
     else:
         error_msg = portfolio_data.get("error", "Unknown error") if portfolio_data else "Failed to analyze portfolio"
         print(f"Error: {error_msg}")
         print("Please ensure your API credentials are set correctly.")
 
+def _print_auto_lending_result(result: Dict[str, Any], symbol: str, period: str):
+    """Human-readable output for auto-lending-check"""
+    print(f"Auto-lending check for {period} period on {symbol}:")
+    print(f"Should lend: {result['should_lend']}")
+    print(f"Reason: {result['reason']}")
+
+    if result['should_lend']:
+        print(f"Recommended rate: {result['recommended_rate']:.8f} ({result['recommended_rate']*100:.4f}%)")
+        print(f"Recommended amount: ${result['recommended_amount']:,.2f}")
+
+    print(f"Confidence score: {result.get('confidence_score', 'N/A')}")
+    print(f"Risk level: {result.get('risk_level', 'N/A')}")
+
+    if result['should_lend']:
+        print("\n✅ Conditions met for auto-lending!")
+        # 這裡可以實際執行借貸
+        # analyzer.execute_auto_lend(symbol, result['recommended_rate'], result['recommended_amount'], period)
+    else:
+        print("\n❌ Conditions not met for auto-lending")
+
 @cli.command()
 @click.option('--symbol', default='USD', help='Funding currency symbol')
 @click.option('--period', type=click.Choice(['2d', '30d']), default='2d', help='Lending period')
 @click.option('--min-confidence', type=float, default=0.7, help='Minimum confidence score (0-1)')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
-def auto_lending_check(symbol, period, min_confidence, api_key, api_secret):
+@click.option('--json', 'as_json', is_flag=True, help='Print the raw result as JSON (for scripts)')
+@click.option('--watch', type=click.IntRange(min=0), default=0, help='Re-run the check every N seconds in this process (0 = run once)')
+@auth_options
+def auto_lending_check(symbol, period, min_confidence, as_json, watch, api_key, api_secret):
     """Check if auto-lending conditions are met (programmatic access example)"""
     try:
-        analyzer = FundingMarketAnalyzer()
-
-        if period == '2d':
-            result = analyzer.should_auto_lend_2day(symbol, min_confidence)
-        else:  # 30d
-            result = analyzer.should_auto_lend_30day(symbol, min_confidence)
+        from funding_market_analyzer import FundingMarketAnalyzer  # 只有分析相關指令需要
 
-        print(f"Auto-lending check for {period} period on {symbol}:")
-        print(f"Should lend: {result['should_lend']}")
-        print(f"Reason: {result['reason']}")
+        analyzer = FundingMarketAnalyzer()
+        check = analyzer.should_auto_lend_2day if period == '2d' else analyzer.should_auto_lend_30day
 
-        if result['should_lend']:
-            print(f"Recommended rate: {result['recommended_rate']:.8f} ({result['recommended_rate']*100:.4f}%)")
-            print(f"Recommended amount: ${result['recommended_amount']:,.2f}")
+        # --watch 在同一個行程內重複檢查，沿用已載入的模組與 keep-alive 連線，取代 cron 每分鐘冷啟動
+        while True:
+            result = check(symbol, min_confidence)
 
-        print(f"Confidence score: {result.get('confidence_score', 'N/A')}")
-        print(f"Risk level: {result.get('risk_level', 'N/A')}")
+            if as_json:
+                # 給程式呼叫端：直接輸出結果 dict，不做文字格式化
+                sys.stdout.write(orjson.dumps(result, default=str, option=_JSON_OPTIONS).decode())
+            else:
+                _print_auto_lending_result(result, symbol, period)
 
-        if result['should_lend']:
-            print("\n✅ Conditions met for auto-lending!")
-            # 這裡可以實際執行借貸
-            # analyzer.execute_auto_lend(symbol, result['recommended_rate'], result['recommended_amount'], period)
-        else:
-            print("\n❌ Conditions not met for auto-lending")
+            if not watch:
+                break
+            sys.stdout.flush()
+            time.sleep(watch)
 
+    except KeyboardInterrupt:
+        pass
     except ValueError as e:
         print(f"Error: {e}")
         print("Please set BITFINEX_API_KEY and BITFINEX_API_SECRET environment variables or provide them as options.")
@@ -1134,6 +1376,8 @@ class FundingLendingAutomation:
         self.auth_api = None
         if api_key and api_secret:
             self.auth_api = AuthenticatedBitfinexAPI(api_key, api_secret)
+        from rich.console import Console  # 自動化流程一律使用 Rich 輸出
+
         self.console = Console()
         self.rate_interval = rate_interval
         self.lowest_offer_rate = None
@@ -1198,30 +1442,31 @@ class FundingLendingAutomation:
                     period_stats[period]['count'] += 1
 
         # Calculate statistics
+        import numpy as np  # 只有自動放貸策略需要 numpy，不拖慢其他指令的啟動
+
         result = {}
         for period, data in period_stats.items():
             if data['rates']:
-                rates = data['rates']
-                volumes = data['volumes']
+                rates = np.asarray(data['rates'], dtype=np.float64)
+                volumes = np.asarray(data['volumes'], dtype=np.float64)
 
-                # Basic statistics
-                avg_rate = sum(rates) / len(rates)
-                max_rate = max(rates)
-                min_rate = min(rates)
-                sorted_rates = sorted(rates)
-                median_rate = sorted_rates[len(sorted_rates) // 2]
+                # Basic statistics (一次排序同時供中位數與前三高使用)
+                sorted_rates = np.sort(rates)
+                avg_rate = float(rates.mean())
+                max_rate = float(sorted_rates[-1])
+                min_rate = float(sorted_rates[0])
+                median_rate = float(sorted_rates[len(sorted_rates) // 2])  # 維持原本取上中位數的定義
 
                 # Volume-weighted average
-                if volumes and len(volumes) == len(rates):
-                    total_volume = sum(volumes)
-                    weighted_sum = sum(rate * vol for rate, vol in zip(rates, volumes))
-                    volume_weighted_avg = weighted_sum / total_volume if total_volume > 0 else avg_rate
+                if len(volumes) == len(rates):
+                    total_volume = float(volumes.sum())
+                    volume_weighted_avg = float(rates @ volumes) / total_volume if total_volume > 0 else avg_rate
                 else:
                     volume_weighted_avg = avg_rate
-                    total_volume = sum(volumes) if volumes else 0
+                    total_volume = float(volumes.sum())
 
                 # Top 3 rates (for stability analysis)
-                top_3_rates = sorted(rates, reverse=True)[:3]
+                top_3_rates = sorted_rates[:-4:-1].tolist()
 
                 result[period] = MarketRateStats(
                     period_days=period,
@@ -1394,6 +1639,8 @@ class FundingLendingAutomation:
         # Get market signals from analyzer (if available)
         market_signals = {}
         try:
+            from funding_market_analyzer import FundingMarketAnalyzer  # 只有分析相關指令需要
+
             analyzer = FundingMarketAnalyzer()
             analysis = analyzer.get_strategy_recommendations(symbol)
             if analysis and hasattr(analysis, 'market_conditions'):
@@ -1756,6 +2003,8 @@ class FundingLendingAutomation:
 
     def display_market_analysis(self, symbol: str) -> None:
         """Display comprehensive tiered market analysis"""
+        from rich.table import Table
+
         self.console.print(f"\n[bold blue]📈 Tiered Market Analysis for f{symbol}[/bold blue]")
 
         tiered_analysis = self.analyze_tiered_market(symbol)
@@ -1867,6 +2116,8 @@ class FundingLendingAutomation:
 
     def display_recommendation(self, recommendation: LendingRecommendation) -> None:
         """Display lending recommendation"""
+        from rich.table import Table
+
         self.console.print(f"\n[bold green]Lending Recommendation for f{recommendation.symbol}[/bold green]")
 
         rec_table = Table(show_header=True, header_style="bold green")
@@ -1884,6 +2135,8 @@ class FundingLendingAutomation:
 
     def display_order_strategy(self, orders: List[LendingOrder], symbol: str, available_balance: Optional[float] = None, pending_total: Optional[float] = None) -> None:
         """Display order placement strategy"""
+        from rich.table import Table
+
         if not orders:
             self.console.print("[red]No orders to display[/red]")
             return
@@ -2030,7 +2283,6 @@ class FundingLendingAutomation:
         api_key, api_secret = order_info['api_key'], order_info['api_secret']
 
         # Create dedicated API instance for this thread with nonce offset
-        import time
         nonce_offset = int(time.time() * 1000) + (i * 1000)  # Offset by thread index
         dedicated_api = AuthenticatedBitfinexAPI(api_key, api_secret)
         # Try to set a unique nonce if possible
@@ -2339,6 +2591,8 @@ class FundingLendingAutomation:
                 self.console.print("\n[bold yellow]Confirm Execution[/bold yellow]")
                 if cancel_existing:
                     self.console.print("[red]⚠️  WARNING: This will cancel ALL existing funding offers before placing new ones![/red]")
+                from rich.prompt import Confirm
+
                 confirmed = Confirm.ask("Do you want to proceed with submitting these lending offers?", default=False)
                 if not confirmed:
                     self.console.print("[yellow]Operation cancelled by user[/yellow]")
@@ -2388,8 +2642,7 @@ class FundingLendingAutomation:
 @click.option('--high-rate-period', type=int, default=120, help='Period in days to use when APY exceeds high-rate threshold (default: 120)')
 @click.option('--prioritize-high-returns/--standard-strategy', default=True, help='Prioritize any >= threshold APY offers regardless of period (default: enabled)')
 @click.option('--no-confirm', is_flag=True, help='Skip user confirmation (use with caution)')
-@click.option('--api-key', envvar='BITFINEX_API_KEY', help='Bitfinex API key')
-@click.option('--api-secret', envvar='BITFINEX_API_SECRET', help='Bitfinex API secret')
+@auth_options
 def funding_lend_automation(symbol, total_amount, min_order, min_order_percentage, max_orders, max_rate_increment, rate_interval, target_period, cancel_existing, parallel, max_workers, allow_small_orders, amount_increment_factor, avg_order_depth, high_return_threshold, high_rate_apy_threshold, high_rate_period, prioritize_high_returns, no_confirm, api_key, api_secret):
     """Automated funding lending strategy with market analysis and tiered orders"""
     try:
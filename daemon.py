@@ -0,0 +1,261 @@
+import dataclasses
+import hashlib
+import logging
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from typing import Any, Optional
+
+import orjson
+
+from authenticated_api import AuthenticatedBitfinexAPI, load_environment
+
+logger = logging.getLogger(__name__)
+
+# 每行一個 JSON 訊息；回傳結果中可能出現非字串的 dict key
+_DUMPS_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+# 允許透過 daemon 呼叫的方法 (只開放 CLI 需要的認證端點)
+ALLOWED_METHODS = {
+    'get_wallets',
+    'get_funding_offers',
+    'get_funding_credits',
+    'get_funding_loans',
+    'post_funding_offer',
+    'cancel_funding_offer',
+    'cancel_all_funding_offers',
+    'cancel_funding_offers',
+    'rebalance',
+}
+
+
+def default_socket_path() -> str:
+    """Default UNIX socket path (override with BITFINEX_DAEMON_SOCKET)"""
+    if os.getenv('BITFINEX_DAEMON_SOCKET'):
+        return os.getenv('BITFINEX_DAEMON_SOCKET')
+    # XDG_RUNTIME_DIR 只有目前使用者可寫入，優先於共用的 /tmp
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "bitfinex-lending.sock")
+    return os.path.join(tempfile.gettempdir(), f"bitfinex-lending-{os.getuid()}.sock")
+
+
+def is_own_socket(path: str) -> bool:
+    """True if path is a UNIX socket owned by the current user (not a symlink or someone else's file)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def is_supported() -> bool:
+    """Daemon mode needs UNIX domain sockets"""
+    return hasattr(socket, 'AF_UNIX') and hasattr(os, 'getuid')
+
+
+def _fingerprint(api_key: str, api_secret: str) -> str:
+    """用來確認 daemon 持有的是同一組 API 憑證，不在 socket 上傳送明文"""
+    return hashlib.sha256(f"{api_key}:{api_secret}".encode()).hexdigest()
+
+
+def _to_wire(value: Any) -> Any:
+    """將 bfxapi 回傳的 dataclass 物件轉成可 JSON 序列化的結構"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        data = {f.name: _to_wire(getattr(value, f.name)) for f in dataclasses.fields(value)}
+        data['__type__'] = type(value).__name__
+        return data
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_wire(v) for k, v in value.items()}
+    return value
+
+
+class RemoteObject:
+    """daemon 回傳物件的本地替身，保留屬性存取與原本的 repr"""
+
+    def __init__(self, type_name: str, fields: dict):
+        self.__dict__.update(fields)
+        self._type_name = type_name
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.__dict__.items() if k != '_type_name')
+        return f"{self._type_name}({fields})"
+
+
+def _from_wire(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_from_wire(v) for v in value]
+    if isinstance(value, dict):
+        data = {k: _from_wire(v) for k, v in value.items()}
+        type_name = data.pop('__type__', None)
+        return RemoteObject(type_name, data) if type_name else data
+    return value
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = orjson.loads(line)
+                response = self.server.dispatch(request)
+            except Exception as e:
+                response = {'error': str(e)}
+            self.wfile.write(orjson.dumps(response, default=str, option=_DUMPS_OPTIONS))
+            self.wfile.flush()
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, api: AuthenticatedBitfinexAPI):
+        self.api = api
+        self.fingerprint = _fingerprint(api.api_key, api.api_secret)
+        # 每個連線各有執行緒，但認證請求必須逐一送出：同一把 key 的 nonce 需嚴格遞增
+        self._api_lock = threading.Lock()
+        super().__init__(socket_path, _RequestHandler)
+
+    def dispatch(self, request: dict) -> dict:
+        if request.get('fingerprint') != self.fingerprint:
+            return {'error': 'credential mismatch'}
+        method = request.get('method')
+        if method == 'ping':
+            return {'result': 'pong'}
+        if method not in ALLOWED_METHODS:
+            return {'error': f"method not allowed: {method}"}
+        with self._api_lock:
+            result = getattr(self.api, method)(*request.get('params', []))
+        return {'result': _to_wire(result)}
+
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a leftover socket file, refusing if it is not ours or another daemon is still listening"""
+    if not os.path.lexists(socket_path):
+        return
+    if not is_own_socket(socket_path):
+        raise RuntimeError(f"{socket_path} exists and is not a socket owned by the current user")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)  # 上一個 daemon 異常結束留下的 socket
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"Another daemon is already listening on {socket_path}")
+
+
+def run_daemon(api_key: Optional[str] = None, api_secret: Optional[str] = None,
+               socket_path: Optional[str] = None):
+    """Serve a persistent AuthenticatedBitfinexAPI over a UNIX socket until interrupted"""
+    if not is_supported():
+        raise RuntimeError("Daemon mode requires UNIX domain sockets (not available on this platform)")
+
+    load_environment()  # 與 connect_auth_api 一致，BITFINEX_DAEMON_SOCKET 也可寫在 .env
+    socket_path = socket_path or default_socket_path()
+    api = AuthenticatedBitfinexAPI(api_key, api_secret)
+
+    _remove_stale_socket(socket_path)
+
+    old_umask = os.umask(0o177)  # socket 僅限目前使用者存取
+    try:
+        server = _DaemonServer(socket_path, api)
+    finally:
+        os.umask(old_umask)
+    socket_inode = os.lstat(socket_path).st_ino
+
+    print(f"Bitfinex daemon listening on {socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # 只刪除自己建立的 socket，路徑若已被換成別的檔案就不動
+        try:
+            if os.lstat(socket_path).st_ino == socket_inode:
+                os.unlink(socket_path)
+        except OSError:
+            pass
+        print("Bitfinex daemon stopped")
+
+
+class DaemonClient:
+    """透過 daemon 呼叫認證 API，介面與 AuthenticatedBitfinexAPI 相同"""
+
+    def __init__(self, api_key: str, api_secret: str, socket_path: Optional[str] = None, timeout: float = 30):
+        socket_path = socket_path or default_socket_path()
+        # 共用目錄下的路徑可能被其他使用者預先建立；不是自己的 socket 就不連線，避免送出指紋或收到偽造結果
+        if not is_own_socket(socket_path):
+            raise ConnectionError(f"{socket_path} is not a socket owned by the current user")
+        self.fingerprint = _fingerprint(api_key, api_secret)
+        self._file = None
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(socket_path)
+            self._file = self._sock.makefile('rwb')
+            if self._call('ping') != 'pong':
+                raise ConnectionError("daemon did not respond")
+        except Exception:
+            self.close()
+            raise
+
+    def _call(self, method: str, *params) -> Any:
+        if self._file is None:
+            raise ConnectionError("daemon connection is closed")
+        request = {'method': method, 'params': list(params), 'fingerprint': self.fingerprint}
+        try:
+            self._file.write(orjson.dumps(request, option=orjson.OPT_APPEND_NEWLINE))
+            self._file.flush()
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("daemon closed the connection")
+            response = orjson.loads(line)
+            if 'error' in response:
+                raise ConnectionError(response['error'])
+            return _from_wire(response['result'])
+        except Exception:
+            # 逾時或讀寫失敗後，daemon 遲到的回應可能還留在緩衝區，會被下一個呼叫當成自己的結果；
+            # 連線一旦出錯就關閉，之後的呼叫直接失敗，不再沿用不同步的連線
+            self.close()
+            raise
+
+    def __getattr__(self, name):
+        if name not in ALLOWED_METHODS:
+            raise AttributeError(name)
+
+        def method(*params):
+            try:
+                return self._call(name, *params)
+            except (OSError, ValueError) as e:
+                logger.error("Daemon request %s failed: %s", name, e)
+                return None
+        return method
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._sock.close()
+
+
+def connect_auth_api(api_key: Optional[str] = None, api_secret: Optional[str] = None):
+    """Use the running daemon when available, otherwise create an in-process client"""
+    load_environment()
+    api_key = api_key or os.getenv('BITFINEX_API_KEY')
+    api_secret = api_secret or os.getenv('BITFINEX_API_SECRET')
+
+    if api_key and api_secret and is_supported():
+        socket_path = default_socket_path()
+        if is_own_socket(socket_path):
+            try:
+                return DaemonClient(api_key, api_secret, socket_path)
+            except (OSError, ValueError):
+                pass  # daemon 不可用或憑證不符，改用本地連線
+
+    return AuthenticatedBitfinexAPI(api_key, api_secret)
@@ -1,11 +1,12 @@
-import statistics
 import json
 import os
-from typing import Dict, List, Tuple, Optional, Any
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from datetime import datetime
 from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from bitfinex_api import BitfinexAPI
-from authenticated_api import AuthenticatedBitfinexAPI
+from authenticated_api import AuthenticatedBitfinexAPI, load_environment
 
 @dataclass
 class MarketStatistics:
@@ -23,6 +24,7 @@ class MarketStatistics:
     trend_direction: str
     recommendation_rate_2d: float
     recommendation_rate_30d: float
+    volume_total: float = 0.0  # volume_distribution 的總和，分析時順便算好；舊快取沒有此欄位
 
 @dataclass
 class LendingStrategy:
@@ -108,10 +110,14 @@ class FundingMarketAnalyzer:
     def analyze_market(self, symbol: str = "USD") -> Optional[MarketStatistics]:
         """執行完整的市場分析"""
         try:
-            # 收集數據
-            book_data = self.api.get_funding_book(symbol)
-            trades_data = self.api.get_funding_trades(symbol, limit=1000)  # 獲取更多歷史數據
-            ticker_data = self.api.get_funding_ticker(symbol)
+            # 收集數據：三個公開端點互不相依，並行發送
+            with ThreadPoolExecutor(max_workers=3) as ex:
+                book_future = ex.submit(self.api.get_funding_book, symbol)
+                trades_future = ex.submit(self.api.get_funding_trades, symbol, limit=1000)  # 獲取更多歷史數據
+                ticker_future = ex.submit(self.api.get_funding_ticker, symbol)
+            book_data = book_future.result()
+            trades_data = trades_future.result()
+            ticker_data = ticker_future.result()
 
             if not book_data or not trades_data or not ticker_data:
                 return None
@@ -129,17 +135,20 @@ class FundingMarketAnalyzer:
                             ticker_data: List) -> MarketStatistics:
         """計算所有統計指標"""
 
+        # 成交列 [ID, MTS, AMOUNT, RATE, PERIOD] 只轉一次 float64 陣列，後續統計皆向量化
+        trades = np.asarray(trades_data, dtype=np.float64)
+
         # 1. 利率統計 (從訂單簿)
         rates_by_period = self._analyze_rates_by_period(book_data)
 
         # 2. 成交分析 (從交易歷史)
-        trade_analysis = self._analyze_trades(trades_data)
+        trade_analysis = self._analyze_trades(trades)
 
         # 3. 市場深度和價差
         market_depth = self._calculate_market_depth(book_data, ticker_data)
 
         # 4. 異常記錄檢測
-        anomalies = self._detect_anomalies(trades_data, book_data)
+        anomalies = self._detect_anomalies(trades_data, trades, book_data)
 
         # 5. 趨勢分析
         trend = self._analyze_trend(trades_data)
@@ -153,14 +162,15 @@ class FundingMarketAnalyzer:
             avg_rate_2d=rates_by_period.get(2, 0),
             avg_rate_30d=rates_by_period.get(30, 0),
             avg_rate_all=sum(rates_by_period.values()) / len(rates_by_period) if rates_by_period else 0,
-            rate_volatility=self._calculate_volatility(trades_data),
+            rate_volatility=self._calculate_volatility(trades),
             bid_ask_spread=market_depth['spread'],
             market_depth_score=market_depth['depth_score'],
             volume_distribution=trade_analysis['volume_distribution'],
             anomalies=anomalies,
             trend_direction=trend,
             recommendation_rate_2d=recommendations['rate_2d'],
-            recommendation_rate_30d=recommendations['rate_30d']
+            recommendation_rate_30d=recommendations['rate_30d'],
+            volume_total=trade_analysis['total_volume']
         )
 
     def _analyze_rates_by_period(self, book_data: List) -> Dict[int, float]:
@@ -182,37 +192,33 @@ class FundingMarketAnalyzer:
 
         return avg_rates
 
-    def _analyze_trades(self, trades_data: List) -> Dict[str, Any]:
-        """分析交易數據"""
-        if not trades_data:
+    def _analyze_trades(self, trades: np.ndarray) -> Dict[str, Any]:
+        """分析交易數據 (trades 為 float64 陣列)"""
+        if not len(trades):
             return {'volume_distribution': {}, 'avg_volume': 0, 'total_volume': 0}
 
-        volumes = []
-        period_volumes = {'2d': [], '30d': [], 'other': []}
-
-        for trade in trades_data:
-            trade_id, timestamp, amount, rate, period = trade
-            volume = abs(amount)
-            volumes.append(volume)
+        volumes = np.abs(trades[:, 2])
+        periods = trades[:, 4]
 
-            # 按期間分類
-            if period == 2:
-                period_volumes['2d'].append(volume)
-            elif period == 30:
-                period_volumes['30d'].append(volume)
-            else:
-                period_volumes['other'].append(volume)
+        # 按期間分類
+        is_2d = periods == 2
+        is_30d = periods == 30
+        period_volumes = {
+            '2d': volumes[is_2d],
+            '30d': volumes[is_30d],
+            'other': volumes[~(is_2d | is_30d)],
+        }
 
         # 計算成交量分佈
         volume_distribution = {}
         for period, vols in period_volumes.items():
-            if vols:
-                volume_distribution[period] = sum(vols)
+            if len(vols):
+                volume_distribution[period] = float(vols.sum())
 
         return {
             'volume_distribution': volume_distribution,
-            'avg_volume': sum(volumes) / len(volumes) if volumes else 0,
-            'total_volume': sum(volumes),
+            'avg_volume': float(volumes.mean()),
+            'total_volume': float(volumes.sum()),
             'period_volumes': period_volumes
         }
 
@@ -239,29 +245,26 @@ class FundingMarketAnalyzer:
             'depth_score': depth_score / 1000000  # 標準化
         }
 
-    def _detect_anomalies(self, trades_data: List, book_data: List) -> List[Dict[str, Any]]:
+    def _detect_anomalies(self, trades_data: List, trades: np.ndarray, book_data: List) -> List[Dict[str, Any]]:
         """檢測異常記錄"""
         anomalies = []
 
-        if trades_data:
-            volumes = [abs(trade[2]) for trade in trades_data]
-            if volumes:
-                avg_volume = sum(volumes) / len(volumes)
-                std_dev = statistics.stdev(volumes) if len(volumes) > 1 else 0
-
-                # 檢測巨額成交 (超過平均值3個標準差)
-                threshold = avg_volume + (3 * std_dev)
-                for trade in trades_data:
-                    trade_id, timestamp, amount, rate, period = trade
-                    if abs(amount) > threshold:
-                        anomalies.append({
-                            'type': 'large_trade',
-                            'trade_id': trade_id,
-                            'amount': amount,
-                            'rate': rate,
-                            'period': period,
-                            'timestamp': datetime.fromtimestamp(timestamp / 1000)
-                        })
+        if len(trades):
+            volumes = np.abs(trades[:, 2])
+            std_dev = volumes.std(ddof=1) if len(volumes) > 1 else 0
+
+            # 檢測巨額成交 (超過平均值3個標準差)；只回頭取命中的原始列，保留原本的 int 型別
+            threshold = volumes.mean() + (3 * std_dev)
+            for i in np.flatnonzero(volumes > threshold):
+                trade_id, timestamp, amount, rate, period = trades_data[i]
+                anomalies.append({
+                    'type': 'large_trade',
+                    'trade_id': trade_id,
+                    'amount': amount,
+                    'rate': rate,
+                    'period': period,
+                    'timestamp': datetime.fromtimestamp(timestamp / 1000)
+                })
 
         # 檢測極端利率
         if book_data:
@@ -305,18 +308,12 @@ class FundingMarketAnalyzer:
 
         return "stable"
 
-    def _calculate_volatility(self, trades_data: List) -> float:
-        """計算利率波動性"""
-        if not trades_data or len(trades_data) < 5:
+    def _calculate_volatility(self, trades: np.ndarray) -> float:
+        """計算利率波動性 (樣本標準差，與 statistics.stdev 相同)"""
+        if len(trades) < 5:
             return 0
 
-        rates = [trade[3] for trade in trades_data]
-        if len(rates) > 1:
-            try:
-                return statistics.stdev(rates)
-            except:
-                return 0
-        return 0
+        return float(trades[:, 3].std(ddof=1))
 
     def _generate_recommendations(self, trade_analysis: Dict, rates_by_period: Dict) -> Dict[str, float]:
         """生成利率建議"""
@@ -462,7 +459,7 @@ class FundingMarketAnalyzer:
         confidence = 0.8  # 基礎信心度
 
         # 數據量影響信心度
-        if sum(stats.volume_distribution.values()) < 100000:
+        if (stats.volume_total or sum(stats.volume_distribution.values())) < 100000:
             confidence -= 0.2
 
         # 波動性影響信心度
@@ -485,6 +482,7 @@ class FundingMarketAnalyzer:
         """分析用戶的放貸投資組合（funding offers和funding loans）"""
         try:
             if not api_key or not api_secret:
+                load_environment()
                 api_key = os.getenv('BITFINEX_API_KEY')
                 api_secret = os.getenv('BITFINEX_API_SECRET')
 
@@ -493,6 +491,7 @@ class FundingMarketAnalyzer:
 
             auth_api = AuthenticatedBitfinexAPI(api_key, api_secret)
 
+            # 認證請求依序發送：Bitfinex 要求同一把 API key 的 nonce 嚴格遞增，並行送出可能亂序而被拒
             # 獲取錢包餘額
             wallets = auth_api.get_wallets()
 
@@ -1093,6 +1092,7 @@ class FundingMarketAnalyzer:
         """執行自動借貸（需要認證）"""
         try:
             if not api_key or not api_secret:
+                load_environment()
                 api_key = os.getenv('BITFINEX_API_KEY')
                 api_secret = os.getenv('BITFINEX_API_SECRET')
 
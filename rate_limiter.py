@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """Simple rate limiter to control API request frequency"""
+    def __init__(self, max_calls_per_minute: int = 30, min_interval_ms: int = 100):
+        self.max_calls_per_minute = max_calls_per_minute
+        self.min_interval_ms = min_interval_ms  # Minimum interval between calls in milliseconds
+        self.calls = []
+        self.last_call_time = 0
+        self.lock = threading.Lock()
+
+    def wait_if_needed(self):
+        """Wait if necessary to respect rate limits"""
+        with self.lock:
+            now = time.time()
+            now_ms = int(now * 1000)
+
+            # Remove calls older than 1 minute
+            self.calls = [call_time for call_time in self.calls if now - call_time < 60]
+
+            # Ensure minimum interval between calls (for nonce safety)
+            time_since_last_call = now_ms - self.last_call_time
+            if time_since_last_call < self.min_interval_ms:
+                sleep_time = (self.min_interval_ms - time_since_last_call) / 1000.0
+                time.sleep(sleep_time)
+
+            # Check rate limit
+            if len(self.calls) >= self.max_calls_per_minute:
+                # Wait until the oldest call is more than 1 minute old
+                sleep_time = 60 - (now - self.calls[0])
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+
+            self.calls.append(now)
+            self.last_call_time = int(time.time() * 1000)
+
+    async def wait_async(self):
+        """Async variant of wait_if_needed (runs the blocking wait in a worker thread)"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.wait_if_needed)
+
+
+# 公開端點共用的限流器，避免並行請求觸發 429 後再付出重試的來回時間
+PUBLIC_RATE_LIMITER = RateLimiter(max_calls_per_minute=90, min_interval_ms=0)
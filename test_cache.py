@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory and on-disk response caches
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cache import FileCache, TTLCache
+
+
+def test_ttl_cache_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache()
+    cache.set('book', [1, 2], ttl=5)
+    assert cache.get('book') == [1, 2]
+    now[0] += 5
+    assert cache.get('book') is None
+    assert 'book' not in cache._data
+
+
+def test_ttl_cache_evicts_oldest_when_full():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    cache.set('a', 10, ttl=60)  # 更新既有項目不觸發淘汰
+    cache.set('c', 3, ttl=60)
+    assert cache.get('a') is None
+    assert (cache.get('b'), cache.get('c')) == (2, 3)
+
+
+def test_file_cache_round_trip_and_expiry(tmp_path):
+    cache = FileCache(str(tmp_path))
+    cache.set(('trades', 'fUSD'), [[1, 2.5]])
+    assert cache.get(('trades', 'fUSD'), ttl=60) == [[1, 2.5]]
+
+    path = cache._path(('trades', 'fUSD'))
+    old = time.time() - 120
+    with open(path, 'wb') as f:
+        f.write(b'{"ts": %f, "data": [1]}' % old)
+    assert cache.get(('trades', 'fUSD'), ttl=60) is None
+    assert os.path.exists(path)  # 較長 TTL 的呼叫端仍可使用
+    assert cache.get(('trades', 'fUSD'), ttl=300) == [1]
+
+
+def test_file_cache_removes_entries_older_than_max_age(tmp_path):
+    cache = FileCache(str(tmp_path), max_age=60)
+    cache.set('k', 1)
+    path = cache._path('k')
+    with open(path, 'wb') as f:
+        f.write(b'{"ts": %f, "data": 1}' % (time.time() - 120))
+    assert cache.get('k', ttl=30) is None
+    assert not os.path.exists(path)
+
+
+def test_file_cache_discards_unexpected_json(tmp_path):
+    cache = FileCache(str(tmp_path))
+    for payload in (b'[1, 2]', b'"text"', b'{"ts": "x"}'):
+        path = cache._path('k')
+        with open(path, 'wb') as f:
+            f.write(payload)
+        assert cache.get('k', ttl=60) is None
+        assert not os.path.exists(path)
+
+
+def test_file_cache_prunes_old_and_excess_files(tmp_path):
+    now = time.time()
+    for i in range(5):
+        path = tmp_path / f"{i}.json"
+        path.write_bytes(b'{}')
+        os.utime(path, (now - i, now - i))
+    stale = tmp_path / "stale.tmp"
+    stale.write_bytes(b'')
+    os.utime(stale, (now - 7200, now - 7200))
+
+    FileCache(str(tmp_path), max_age=3600, max_files=3)
+    assert sorted(os.listdir(tmp_path)) == ['0.json', '1.json', '2.json']
+
+
+def test_file_cache_write_is_atomic(tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path))
+    replaced = []
+    real_replace = os.replace
+
+    def spy_replace(src, dst):
+        assert os.path.dirname(src) == str(tmp_path) and src.endswith('.tmp')
+        assert not os.path.exists(dst)  # 目標檔只在替換時才出現
+        replaced.append(dst)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', spy_replace)
+    cache.set('k', {'a': 1})
+    assert replaced == [cache._path('k')]
+    assert os.listdir(tmp_path) == [os.path.basename(cache._path('k'))]
+    assert cache.get('k', ttl=60) == {'a': 1}
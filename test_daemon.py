@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the authenticated API daemon (in-process server over a temp UNIX socket)
+"""
+
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import List
+
+import orjson
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import daemon
+
+pytestmark = pytest.mark.skipif(not daemon.is_supported(), reason="daemon mode needs UNIX domain sockets")
+
+
+@dataclass
+class FakeWallet:
+    wallet_type: str
+    currency: str
+    balance: float
+
+
+@dataclass
+class FakeNotification:
+    status: str
+    data: List[FakeWallet]
+
+
+class FakeAPI:
+    """Stand-in for AuthenticatedBitfinexAPI: only the attributes the daemon touches"""
+    api_key = 'key'
+    api_secret = 'secret'
+
+    def get_wallets(self):
+        return [FakeWallet('funding', 'USD', 100.5)]
+
+    def get_funding_offers(self, symbol=None):
+        time.sleep(0.5)  # 慢回應，用來測試逾時
+        return ['late']
+
+    def get_funding_credits(self, symbol=None):
+        return ['credits']
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = str(tmp_path / "d.sock")
+    server = daemon._DaemonServer(path, FakeAPI())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_ping(socket_path):
+    client = daemon.DaemonClient('key', 'secret', socket_path)
+    assert client._call('ping') == 'pong'
+    client.close()
+
+
+def test_whitelisted_call_returns_remote_objects(socket_path):
+    client = daemon.DaemonClient('key', 'secret', socket_path)
+    wallets = client.get_wallets()
+    assert len(wallets) == 1
+    assert (wallets[0].wallet_type, wallets[0].currency, wallets[0].balance) == ('funding', 'USD', 100.5)
+    assert repr(wallets[0]).startswith('FakeWallet(')
+    client.close()
+
+
+def test_non_whitelisted_method_is_rejected(socket_path):
+    client = daemon.DaemonClient('key', 'secret', socket_path)
+    with pytest.raises(AttributeError):
+        client.get_ledgers
+    with pytest.raises(ConnectionError, match="method not allowed"):
+        client._call('get_ledgers')
+
+
+def test_credential_mismatch(socket_path):
+    with pytest.raises(ConnectionError, match="credential mismatch"):
+        daemon.DaemonClient('other-key', 'secret', socket_path)
+
+
+def test_failed_call_closes_connection(socket_path):
+    client = daemon.DaemonClient('key', 'secret', socket_path, timeout=0.1)
+    assert client.get_funding_offers() is None  # 逾時
+    time.sleep(0.6)  # daemon 的遲到回應此時已送達
+    # 不可把上一個呼叫的遲到回應當成這次的結果
+    assert client.get_funding_credits() is None
+    assert client._file is None
+
+
+def test_refuses_socket_not_owned_by_user(tmp_path):
+    path = tmp_path / "not-a-socket"
+    path.write_text("")
+    with pytest.raises(ConnectionError):
+        daemon.DaemonClient('key', 'secret', str(path))
+
+
+def test_second_daemon_refuses_live_socket(socket_path):
+    with pytest.raises(RuntimeError, match="already listening"):
+        daemon._remove_stale_socket(socket_path)
+
+
+def test_wire_round_trip():
+    value = FakeNotification('SUCCESS', [FakeWallet('funding', 'USD', 1.25), FakeWallet('exchange', 'BTC', 0.5)])
+    wire = orjson.loads(orjson.dumps(daemon._to_wire(value)))
+    restored = daemon._from_wire(wire)
+
+    assert restored.status == 'SUCCESS'
+    assert [(w.wallet_type, w.currency, w.balance) for w in restored.data] == [
+        ('funding', 'USD', 1.25), ('exchange', 'BTC', 0.5)]
+    assert repr(restored.data[0]) == "FakeWallet(wallet_type='funding', currency='USD', balance=1.25)"
+
+
+def test_wire_keeps_plain_values():
+    value = {'ids': [1, 2], 'nested': {'ok': True}, 'none': None}
+    assert daemon._from_wire(daemon._to_wire(value)) == value